@@ -1,13 +1,34 @@
+from . import _external, _internal, _toposort, _parallel_probe
 
-from . import _external, _internal
-
+import importlib
 import os
+import sys
+import types
 dir = os.path.abspath(os.path.dirname(__file__))
 
-# get files list in current directory and import them to make each library available
+# get files list in current directory, each library is available as an attribute of the package
+# (the module of a library is only imported when the library is used)
 files = os.listdir(dir)
 modules = [ file[:-3] for file in files if file.endswith(".py") and not file.startswith('_') ]
-for module in modules:
-	mod = __import__('sconsProject.autoconf.'+module, fromlist=['sconsProject', 'autoconf'])
-	globals()[module] = getattr(mod, module)
+__all__ = list(modules)
+
+def __getattr__(name):
+	'''Import the module of the library checker "name" on first use.'''
+	if name in modules:
+		checker = getattr(importlib.import_module('.'+name, __name__), name)
+		globals()[name] = checker
+		return checker
+	raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
+def __dir__():
+	return sorted(set(globals()) | set(modules))
+
+class _LazyPackage(types.ModuleType):
+	def __setattr__(self, name, value):
+		# the import of a library module sets it as attribute of the package,
+		# it would hide the library checker of the same name
+		if name in modules and isinstance(value, types.ModuleType):
+			return
+		super().__setattr__(name, value)
 
+sys.modules[__name__].__class__ = _LazyPackage
@@ -4,6 +4,9 @@ from SCons import Node
 
 from operator import add
 
+from . import _toposort
+
+import glob
 import os
 import sys
 windows = os.name.lower() == "nt" and sys.platform.lower().startswith("win")
@@ -17,6 +20,150 @@ def asList(v):
 		return v[:]
 	return [v]
 
+# environment variables which change the result of a configure test
+probeEnvKeys = ['CC', 'CCVERSION', 'CXX', 'CXXVERSION', 'CCFLAGS', 'CFLAGS', 'CXXFLAGS', 'CPPFLAGS', 'CPPDEFINES',
+                'CPPPATH', 'EXTERNCPPPATH', 'EXTERNINCPREFIX', 'LIBPATH', 'LIBS', 'LINKFLAGS', 'FRAMEWORKS']
+
+# directories searched by the compilers by default, the tested files may also be installed there
+systemIncludeDirs = ['/usr/local/include', '/usr/include'] if unix else []
+systemLibDirs = ['/usr/local/lib', '/usr/local/lib64', '/usr/lib', '/usr/lib64'] + sorted(glob.glob('/usr/lib/*-linux-gnu')) if unix else []
+
+def probeFiles(env, testName, args):
+	'''
+	Returns the (path, modification time, size) of the headers and libraries tested by "testName" (eg. CheckLib),
+	searched in the include and library paths of env. A file which is not found gives None,
+	so the result changes if a file is installed, moved, updated or removed in these paths.
+	'''
+	headers = []
+	libs = []
+	if testName == 'CheckHeader' and args:
+		headers = asList(args[0])
+	elif testName == 'CheckLib' and args:
+		libs = asList(args[0])
+	elif testName == 'CheckLibWithHeader' and len(args) > 1:
+		libs = asList(args[0])
+		headers = asList(args[1])
+	def searchPaths(keys, systemDirs):
+		dirs = [d for k in keys for d in asList(env.get(k, [])) if d]
+		return [env.Dir(env.subst(d) if isinstance(d, str) else d).abspath for d in dirs] + systemDirs
+	def stamp(candidates, paths):
+		for d in paths:
+			for name in candidates:
+				path = os.path.join(d, name)
+				try:
+					st = os.stat(path)
+				except OSError:
+					continue
+				return (path, st.st_mtime, st.st_size)
+		return None
+	stamps = []
+	if headers:
+		paths = searchPaths(('CPPPATH', 'EXTERNCPPPATH'), systemIncludeDirs)
+		stamps += [stamp([str(h)], paths) for h in headers if h]
+	if libs:
+		paths = searchPaths(('LIBPATH',), systemLibDirs)
+		prefix = env.subst('$LIBPREFIX')
+		suffixes = [env.subst('$SHLIBSUFFIX'), env.subst('$LIBSUFFIX')]
+		stamps += [stamp([prefix + str(l) + s for s in suffixes], paths) for l in libs if l]
+	return stamps
+
+def probeCacheFile(env, testName, args, kwargs):
+	'''
+	Returns the file storing the result of a configure test called with "args" in "env".
+	The file name is a hash of the compiler, the flags, the test arguments and the state of the tested files.
+	The files are stored in $CONFIGUREDIR, so they are removed with the other configure files of SCons.
+	'''
+	import hashlib
+	def probeValue(v):
+		if isinstance(v, (list, tuple)):
+			return [str(i) for i in v]
+		return str(v)
+	values = [probeValue(env.get(k, '')) for k in probeEnvKeys]
+	key = hashlib.blake2b(repr((values, testName, args, sorted(kwargs.items()), probeFiles(env, testName, args))).encode()).hexdigest()
+	return os.path.join(env.Dir('$CONFIGUREDIR').abspath, '.autoconf_cache', key + '.json')
+
+def storeProbe(cacheFile, addedLibs):
+	'''
+	Store a successful configure test, with the libraries it added to LIBS.
+	Errors are ignored, the cache is only an optimization.
+	'''
+	import json
+	try:
+		if not os.path.isdir(os.path.dirname(cacheFile)):
+			os.makedirs(os.path.dirname(cacheFile))
+		with open(cacheFile, 'w') as f:
+			json.dump({'LIBS': addedLibs}, f)
+	except (IOError, OSError):
+		pass
+
+def probeDescription(testName, args, kwargs):
+	'''Returns the description of a configure test, like the messages of SCons.'''
+	language = 'C++' if str(kwargs.get('language', 'C')).lower() in ('c++', 'cpp', 'cxx') else 'C'
+	if testName == 'CheckHeader' and args:
+		return '%s header file %s' % (language, args[0])
+	if testName in ('CheckLib', 'CheckLibWithHeader') and args:
+		return '%s library %s' % (language, args[0])
+	return testName
+
+def cachedProbe(conf, testName, *args, **kwargs):
+	'''
+	Run the configure test "testName" (eg. CheckLib) only if it has not already succeeded
+	with the same compiler, flags, arguments and tested files. Failures are never stored, so they are always checked again.
+	The cache is not used with --config=force.
+	'''
+	import json
+	from SCons.Script import GetOption
+	env = conf.env
+	cacheFile = probeCacheFile(env, testName, args, kwargs)
+	if GetOption('config') != 'force':
+		try:
+			with open(cacheFile) as f:
+				addedLibs = json.load(f)['LIBS']
+			# apply the side effect of the test
+			if addedLibs:
+				env.Append( LIBS = addedLibs )
+			print('Checking for %s... (cached) yes' % probeDescription(testName, args, kwargs))
+			return True
+		except (IOError, OSError, ValueError, KeyError):
+			pass
+
+	previousLibs = list(env.get('LIBS', []))
+	result = getattr(conf, testName)(*args, **kwargs)
+	# a recording context only pretends the test succeeded
+	if result and not getattr(conf, 'isRecording', False):
+		addedLibs = [l for l in env.get('LIBS', []) if l not in previousLibs]
+		if all(isinstance(l, str) for l in addedLibs):
+			storeProbe(cacheFile, addedLibs)
+	return result
+
+def lazyChecker(moduleGlobals, checkerName, depsNames, factory):
+	'''
+	Creates the checker "checkerName" of a library module on first use, with factory(dependencies).
+	The dependencies (names of autoconf modules) are only imported at that time.
+	Defines the __getattr__ and __all__ of the module, to call at the end of the module.
+	Returns the function returning the checker.
+	'''
+	import functools
+	import importlib
+	def dependency(name):
+		return getattr(importlib.import_module('.' + name, moduleGlobals['__package__']), name)
+
+	@functools.lru_cache(maxsize=None)
+	def getChecker():
+		return factory([dependency(n) for n in depsNames])
+
+	def __getattr__(name):
+		if name == checkerName:
+			return getChecker()
+		if name in depsNames:
+			return dependency(name)
+		raise AttributeError("module %r has no attribute %r" % (moduleGlobals['__name__'], name))
+
+	moduleGlobals['__getattr__'] = __getattr__
+	# "from ... import *" also exports the lazy names (the module __getattr__ is not used without __all__)
+	moduleGlobals['__all__'] = [n for n in moduleGlobals if not n.startswith('_')] + list(depsNames) + [checkerName]
+	return getChecker
+
 class BaseLibChecker(object):
 	'''
 	Base class for lib checkers.
@@ -34,7 +181,22 @@ class BaseLibChecker(object):
 	linkflags = []
 	checkDone    = False
 	sconsNode = None # specific to internal libraries, None by default
+	alwaysEnabled = False # if True, the library can't be disabled and enabled() is not called by the project
+	hasOptions = True     # if False, the library has no option and initOptions() is not called by the project
+	_flatDeps = None    # cache of flatDependencies()
+	_flatDepsKey = None # direct dependencies used to compute _flatDeps
 
+	def flatDependencies(self):
+		'''
+		Returns all the dependencies of the library (without the library itself), each one only once
+		and after its own dependencies, as a list of tuples (lib, level).
+		The graph is only traversed again if the direct dependencies change.
+		'''
+		key = tuple(id(d) for d in self.dependencies)
+		if self._flatDepsKey != key:
+			self._flatDeps = _toposort.toposort(self.dependencies)
+			self._flatDepsKey = key
+		return self._flatDeps
 
 	def enabled( self, env, option=None ):
 		'''
@@ -143,7 +305,7 @@ class BaseLibChecker(object):
 				conf.env.PrependUnique( LIBS = libs[:-1] )
 
 				libs = libs[-1]
-			return conf.CheckLibWithHeader( libs, header, language=language, call=call )
+			return cachedProbe( conf, 'CheckLibWithHeader', libs, header, language=language, call=call )
 		else:
 			conf.env.PrependUnique( LIBS = libs )
 			#print 'no CheckLibWithHeader', self.name
@@ -162,7 +324,7 @@ class BaseLibChecker(object):
 			if isinstance(libs, list) and len(libs) > 1:
 				conf.env.PrependUnique( LIBS =  libs[:-1] )
 				libs =  libs[-1]
-			return conf.CheckLib(  libs )
+			return cachedProbe( conf, 'CheckLib', libs )
 		else:
 			conf.env.PrependUnique( LIBS =  libs )
 			#print 'no CheckLib', self.name
@@ -188,7 +350,7 @@ class BaseLibChecker(object):
 
 	def CheckHeader( self, conf, header, language ):
 		if conf.env['check_libs'] and not self.checkDone:
-			return conf.CheckHeader( header, language=language )
+			return cachedProbe( conf, 'CheckHeader', header, language=language )
 		else:
 			#print 'no CheckHeader', self.name
 			return True
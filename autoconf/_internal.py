@@ -1,3 +1,4 @@
+import sys
 
 from SCons import Variables
 from SCons import Environment
@@ -5,18 +6,22 @@ from SCons import Environment
 from ._base import *
 
 class InternalLibChecker(BaseLibChecker):
+	alwaysEnabled = True
+	hasOptions = False
 
-	def __init__(self, lib='', name='', includes=[], envFlags={}, dependencies=[], sconsNode=None, addSources=[] ):
+	def __init__(self, lib='', name='', includes=None, envFlags=None, dependencies=None, sconsNode=None, addSources=None ):
 		self.libs  = [lib] # the target (name of the library file without prefix or extension)
 		if name:
 			self.name = name
 		else:
 			self.name = lib
-		self.includes= list(includes) # includes directories
-		self.envFlags = envFlags # library specific flags
-		self.dependencies = list(dependencies) # all libraries needed by this library (need to be propagated to all targets using this library)
+		# includes directories (identical paths are shared between all the checkers)
+		# (read only values are stored in tuples)
+		self.includes = tuple(sys.intern(i) if isinstance(i, str) else i for i in (includes or ()))
+		self.envFlags = dict(envFlags) if envFlags else {} # library specific flags
+		self.dependencies = tuple(dependencies or ()) # all libraries needed by this library (need to be propagated to all targets using this library)
 		self.sconsNode = sconsNode # a reference to the scons node object, we can use to use Depends, Alias, etc.
-		self.addSources = addSources
+		self.addSources = tuple(addSources or ())
 
 	def enabled(self,env,option=None):
 		'''Can't disable an internal library.'''
@@ -30,11 +35,12 @@ class InternalLibChecker(BaseLibChecker):
 		'''
 		Add things to the environment.
 		'''
+		# the flags are applied to env by the project at the end of the configure pass
 		if self.includes:
-			env.AppendUnique( CPPPATH = self.includes )
+			project.pendingAppend( env, CPPPATH = self.includes )
 		
 		if self.envFlags:
-			env.AppendUnique( **(self.envFlags) )
+			project.pendingAppend( env, **(self.envFlags) )
 
 		# we don't set LIBPATH because it's setted by the project
 		# all internal libs are compiled in the same directory
@@ -45,12 +51,12 @@ class InternalLibChecker(BaseLibChecker):
 	def postconfigure(self, project, env, level):
 		'''Don't check for local lib, so we only add it.'''
 		if self.libs:
-			env.PrependUnique( LIBS = self.libs )
+			project.pendingPrepend( env, LIBS = self.libs )
 		if level == 0:
 			if self.addSources:
 				#print '!'*100
 				#print self.name
 				#print 'level:', level
-				env.Append( ADDSRC = self.addSources )
+				env.Append( ADDSRC = list(self.addSources) ) # SCons doesn't expand tuples
 
 
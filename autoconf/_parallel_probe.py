@@ -0,0 +1,150 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+from ._base import asList, probeCacheFile, storeProbe
+
+
+# compilers accepting the -c and -o options of the probe command lines
+gccLikeCompilers = ('gcc', 'clang')
+
+def isCxx(language):
+	'''Same language names as SCons configure tests.'''
+	return str(language).lower() in ('c++', 'cpp', 'cxx')
+
+def probeProgram(headers, call):
+	'''
+	Returns the source code of a configure test (like the programs generated by SCons).
+	'''
+	lines = ['#include <%s>' % h for h in headers]
+	lines.append('int main(void) {')
+	if call:
+		lines.append('  ' + call)
+	lines.append('return 0;')
+	lines.append('}')
+	return '\n'.join(lines) + '\n'
+
+
+class Probe(object):
+	'''
+	A configure test to compile (and link) outside of SCons.
+	'''
+	def __init__(self, cacheFile, program, suffix, compileCmd, linkCmd, addedLibs, processEnv):
+		self.cacheFile = cacheFile   # probe cache file to create if the test succeeds
+		self.program = program       # source code of the test
+		self.suffix = suffix         # source file suffix
+		self.compileCmd = compileCmd # compiler and flags
+		self.linkCmd = linkCmd       # None to only compile, else (linker and flags, libraries flags)
+		self.addedLibs = addedLibs   # libraries added to LIBS by the test
+		self.processEnv = processEnv # execution environment of the commands
+
+
+class UnrecordedTest(Exception):
+	'''Raised by RecordingConf for a configure test it can't record.'''
+	pass
+
+
+class RecordingConf(object):
+	'''
+	Replacement of a SCons Configure context, which records the configure tests instead of running them.
+	All the tests are supposed to succeed, so the environment evolves like during successful checks
+	and each recorded test has the same probe cache file than the real one.
+	'''
+	isRecording = True
+
+	def __init__(self, env):
+		self.env = env
+		self.probes = []
+
+	def CheckHeader(self, header, *args, **kwargs):
+		language = kwargs.get('language', args[1] if len(args) > 1 else None)
+		self.record('CheckHeader', (header,) + args, kwargs, asList(header), language, None, None, link=False)
+		return True
+
+	def CheckLib(self, library=None, *args, **kwargs):
+		lib = asList(library)[0] if library else None
+		language = kwargs.get('language')
+		self.record('CheckLib', (library,) + args, kwargs, [], language, lib, None, link=True)
+		return True
+
+	def CheckLibWithHeader(self, libs, header, *args, **kwargs):
+		lib = asList(libs)[0] if libs else None
+		language = kwargs.get('language', args[0] if args else None)
+		call = kwargs.get('call', args[1] if len(args) > 1 else None)
+		self.record('CheckLibWithHeader', (libs, header) + args, kwargs, asList(header), language, lib, call, link=True)
+		return True
+
+	def __getattr__(self, name):
+		# other tests are not recorded: a check depending on their result would record the wrong tests,
+		# so the recording of the library is aborted and SCons does all its checks
+		if name.startswith('_'):
+			raise AttributeError(name)
+		def unrecordedTest(*args, **kwargs):
+			raise UnrecordedTest(name)
+		return unrecordedTest
+
+	def record(self, testName, args, kwargs, headers, language, lib, call, link):
+		env = self.env
+		cacheFile = probeCacheFile(env, testName, args, kwargs)
+		if isCxx(language):
+			compileCmd = env.subst_list('$CXX $CXXFLAGS $CCFLAGS $_CCCOMCOM')[0]
+			suffix = '.cpp'
+		else:
+			compileCmd = env.subst_list('$CC $CFLAGS $CCFLAGS $_CCCOMCOM')[0]
+			suffix = '.c'
+		compileCmd = [str(c) for c in compileCmd]
+		addedLibs = [lib] if lib else []
+		# side effect of a successful test
+		if addedLibs:
+			env.Append( LIBS = addedLibs )
+		linkCmd = None
+		if link:
+			linkCmd = ([compileCmd[0]] + [str(c) for c in env.subst_list('$LINKFLAGS')[0]],
+			           [str(c) for c in env.subst_list('$_LIBDIRFLAGS $_LIBFLAGS')[0]])
+		if os.path.exists(cacheFile):
+			return
+		processEnv = dict((k, str(v)) for k, v in env['ENV'].items())
+		self.probes.append( Probe(cacheFile, probeProgram(headers, call), suffix, compileCmd, linkCmd, addedLibs, processEnv) )
+
+
+def runCommand(cmd, processEnv):
+	try:
+		return subprocess.run(cmd, env=processEnv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=120).returncode == 0
+	except (OSError, subprocess.SubprocessError):
+		return False
+
+def runProbe(probe):
+	'''
+	Compile (and link) the test program of probe in a temporary directory.
+	The command lines are written for gcc-like compilers (see gccLikeCompilers).
+	Returns True on success.
+	'''
+	tmpdir = tempfile.mkdtemp(prefix='sconsProject_probe_')
+	try:
+		source = os.path.join(tmpdir, 'conftest' + probe.suffix)
+		with open(source, 'w') as f:
+			f.write(probe.program)
+		obj = os.path.join(tmpdir, 'conftest.o')
+		if not runCommand(probe.compileCmd + ['-c', source, '-o', obj], probe.processEnv):
+			return False
+		if probe.linkCmd is None:
+			return True
+		linkCmd, libsFlags = probe.linkCmd
+		return runCommand(linkCmd + ['-o', os.path.join(tmpdir, 'conftest'), obj] + libsFlags, probe.processEnv)
+	finally:
+		shutil.rmtree(tmpdir, ignore_errors=True)
+
+def probeAll(probes, jobs=None):
+	'''
+	Run all the probes in parallel and store the successful ones in the probe cache.
+	The work is done by the compiler processes, so threads are enough to run them in parallel.
+	'''
+	from concurrent.futures import ThreadPoolExecutor
+	uniqueProbes = list(dict((p.cacheFile, p) for p in probes).values())
+	if not uniqueProbes:
+		return
+	with ThreadPoolExecutor(jobs or os.cpu_count() or 1) as executor:
+		for probe, success in zip(uniqueProbes, executor.map(runProbe, uniqueProbes)):
+			if success:
+				storeProbe(probe.cacheFile, probe.addedLibs)
@@ -0,0 +1,58 @@
+from collections import deque
+
+
+def libKey(lib):
+	'''Identity of a library checker in the dependency graph.'''
+	return (lib.name, lib.id)
+
+def toposort(roots):
+	'''
+	Returns all libraries of the dependency graph starting from "roots" (roots included),
+	each library appearing once and after all its dependencies.
+	Returns a list of tuples (lib, level) where level is the minimal depth of the library from the roots.
+	'''
+	# materialize the graph (breadth first, so the level is the minimal depth)
+	nodes = {}   # key -> [lib, level, number of dependencies not already sorted]
+	order = []   # keys in discovery order, to keep a stable result
+	users = {}   # key -> keys of the libraries depending on it
+	frontier = deque()
+	for lib in roots:
+		if lib and libKey(lib) not in nodes:
+			nodes[libKey(lib)] = [lib, 0, 0]
+			order.append(libKey(lib))
+			frontier.append(lib)
+	while frontier:
+		lib = frontier.popleft()
+		key = libKey(lib)
+		level = nodes[key][1]
+		depKeys = set()
+		for dep in lib.dependencies:
+			if not dep:
+				continue
+			depKey = libKey(dep)
+			if depKey in depKeys:
+				continue
+			depKeys.add(depKey)
+			if depKey not in nodes:
+				nodes[depKey] = [dep, level+1, 0]
+				order.append(depKey)
+				frontier.append(dep)
+			users.setdefault(depKey, []).append(key)
+		nodes[key][2] = len(depKeys)
+
+	# Kahn's algorithm, from the leaves (libraries without dependencies) to the roots
+	ready = deque(k for k in order if nodes[k][2] == 0)
+	result = []
+	done = set()
+	while ready:
+		key = ready.popleft()
+		done.add(key)
+		result.append((nodes[key][0], nodes[key][1]))
+		for user in users.get(key, []):
+			nodes[user][2] -= 1
+			if nodes[user][2] == 0:
+				ready.append(user)
+	# dependency cycles can't be sorted, keep them in discovery order
+	if len(result) != len(order):
+		result.extend((nodes[k][0], nodes[k][1]) for k in order if k not in done)
+	return result
@@ -1,13 +1,12 @@
 from ._external import *
-from .boost import *
 
 class BoostUnittestframeworkChecker(BaseLibChecker):
 
-    def __init__( self ):
+    def __init__( self, dependencies ):
         self.name  = 'boost_unit_test_framework'
         self.libs  = [self.name]
         self.language = 'c++',
-        self.dependencies=[boost]
+        self.dependencies=dependencies
 
     def configure(self, project, env):
         if not self.enabled(env):
@@ -24,5 +23,5 @@ class BoostUnittestframeworkChecker(BaseLibChecker):
         return result
 
 
-boost_unit_test_framework = BoostUnittestframeworkChecker()
-
+# the dependencies are only imported when the boost_unit_test_framework checker is used
+getBoostUnitTestFramework = lazyChecker(globals(), 'boost_unit_test_framework', ('boost',), BoostUnittestframeworkChecker)
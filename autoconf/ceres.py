@@ -1,22 +1,10 @@
 from ._external import *
-from .eigen import *
-from .pthread import *
-from .amd import *
-from .gomp import *
-from .lapack import *
-from .suitesparse import *
-from .glog import *
 
-ceres = LibWithHeaderChecker('ceres',
-                             'ceres/ceres.h',
-                             'c++',
-                             name='ceres',
-                             dependencies=[
-                                 eigen,
-                                 gomp,
-                                 lapack,
-                                 suitesparse,
-                                 amd,
-                                 pthread,
-                                 glog],
-                             )
+# the dependencies are only imported when the ceres checker is used
+getCeres = lazyChecker(globals(), 'ceres', ('eigen', 'gomp', 'lapack', 'suitesparse', 'amd', 'pthread', 'glog'),
+                       lambda dependencies: LibWithHeaderChecker('ceres',
+                                                                 'ceres/ceres.h',
+                                                                 'c++',
+                                                                 name='ceres',
+                                                                 dependencies=dependencies,
+                                                                 ))
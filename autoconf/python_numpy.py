@@ -1,10 +1,10 @@
 from ._external import *
-from .python import *
-
-python_numpy = HeaderChecker(
-                   name='python_numpy',
-                   # libs='npymath',
-                   header='numpy/numpyconfig.h',
-                   language='c',
-                   dependencies=[python])
 
+# the dependencies are only imported when the python_numpy checker is used
+getPythonNumpy = lazyChecker(globals(), 'python_numpy', ('python',),
+                             lambda dependencies: HeaderChecker(
+                                 name='python_numpy',
+                                 # libs='npymath',
+                                 header='numpy/numpyconfig.h',
+                                 language='c',
+                                 dependencies=dependencies))
@@ -1 +1,8 @@
-from . import gcc, visual, clang
+from . import gcc, visual, clang, _cache
+
+# compiler modules by name of the "compiler" option
+compilers = {
+    'gcc': gcc,
+    'clang': clang,
+    'visual': visual,
+    }
@@ -0,0 +1,101 @@
+import os
+
+# environment variables used to locate the shared derived-file cache, by priority
+cacheEnvVars = ['SCONS_CACHE', 'PROJECT_SCONS_CACHE_DIR']
+
+# the message about the disabled cache is only displayed once per run
+_disabledCacheNotified = False
+
+
+def getCacheDir():
+    '''
+    Returns the cache directory defined in the user environment or None.
+    '''
+    for var in cacheEnvVars:
+        path = os.environ.get(var)
+        if path:
+            return path
+    return None
+
+
+def enableCache(env, path=None):
+    '''
+    Enable the SCons derived-file cache on "env".
+    If "path" is None, use the directory defined by $SCONS_CACHE or $PROJECT_SCONS_CACHE_DIR.
+    Unchanged objects are copied from the cache instead of being rebuilt by the compiler.
+    Returns the cache directory or None if the cache is disabled.
+    '''
+    global _disabledCacheNotified
+    if not path:
+        path = getCacheDir()
+    if not path:
+        if not _disabledCacheNotified:
+            _disabledCacheNotified = True
+            print('Info: SCons cache disabled, set $SCONS_CACHE to share built objects between builds.')
+        return None
+    # --cache-show can only be given on the command line
+    env.CacheDir(path)
+    return path
+
+
+def noCache(env, nodes):
+    '''
+    Exclude "nodes" from the cache (eg. generated files depending on the build date or version stamps).
+    '''
+    return env.NoCache(nodes)
+
+
+def versionCacheFile(name):
+    '''
+    Returns the file used to store the versions of the compilers named "name".
+    '''
+    return os.path.join(os.path.expanduser('~'), '.cache', 'sconsProject', name + '_version.json')
+
+
+def binaryKey(bin):
+    '''
+    Returns a key identifying the binary "bin" (path, modification time and size) or None if not found.
+    '''
+    import hashlib
+    import shutil
+    path = shutil.which(bin)
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return hashlib.blake2b(repr((path, st.st_mtime, st.st_size)).encode()).hexdigest()
+
+
+def readVersionCache(name, key):
+    '''
+    Returns the version stored for "key" or None.
+    '''
+    import json
+    try:
+        with open(versionCacheFile(name)) as f:
+            return json.load(f).get(key)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def writeVersionCache(name, key, versionStr):
+    '''
+    Store "versionStr" for "key". Errors are ignored, the cache is only an optimization.
+    '''
+    import json
+    filename = versionCacheFile(name)
+    try:
+        with open(filename) as f:
+            versions = json.load(f)
+    except (IOError, OSError, ValueError):
+        versions = {}
+    versions[key] = versionStr
+    try:
+        if not os.path.isdir(os.path.dirname(filename)):
+            os.makedirs(os.path.dirname(filename))
+        with open(filename, 'w') as f:
+            json.dump(versions, f)
+    except (IOError, OSError):
+        pass
@@ -1,6 +1,9 @@
+import functools
 import os
+import shutil
 import sys
-from . import gcc
+import types
+from . import gcc, _cache
 import re
 
 name = 'clang'
@@ -8,6 +11,7 @@ ccBin = 'clang'
 cxxBin = 'clang++'
 arBin = 'ar'
 ranlibBin = 'ranlib'
+externIncPrefix = '-isystem' # include directories of the external libraries
 linkBin = ccBin
 linkxxBin = cxxBin
 ccVersionStr = 'unknown'
@@ -16,7 +20,8 @@ cxxVersionStr = 'unknown'
 cxxVersion = [0,0,0]
 
 # by default, same interface than gcc
-CC = dict(gcc.CC)
+# (the flags are immutable, so they can be shared with gcc)
+CC = gcc.FlagsDict(gcc.CC)
 
 # "-dumpversion" is a gcc option that still exist on clang for compatibility reasons,
 # but it always returns the latest compatible gcc version... which is "4.2.1".
@@ -28,16 +33,41 @@ CC['debug']   = ['-g'] + CC['nooptimize']
 
 #CC['stdlib'] = ['libc++']
 
+# read-only snapshot of the flags before setup(),
+# each setup() starts from it so successive variant setups don't accumulate flags
+_DEFAULT_CC = types.MappingProxyType(dict(CC))
 
+
+# Use a regex because the clang output change between platforms.
+_VERSION_RE = re.compile(r'.*?clang version (\d(?:\.?\d)?(?:\.?\d)?).*')
+_DIGITS_RE = re.compile(r"\d+")
+# versioned binaries installed by the distributions (eg. /usr/bin/clang-17)
+_VERSIONED_BIN_RE = re.compile(r'^clang(?:\+\+)?-(\d+)$')
+
+
+@functools.lru_cache(maxsize=None)
 def retrieveVersion( bin = 'clang' ):
+    # the major version is in the name of versioned binaries, no need to run them
+    path = shutil.which(bin)
+    m = _VERSIONED_BIN_RE.match(os.path.basename(path or ''))
+    if m:
+        return m.group(1) + '.0.0'
+    # the version of a binary is stored on disk until the binary changes
+    key = _cache.binaryKey(bin)
+    if key:
+        versionStr = _cache.readVersionCache(name, key)
+        if versionStr:
+            return versionStr
     import subprocess
     try:
-        versionMsg = subprocess.Popen([bin, CC['version']], stdout=subprocess.PIPE).communicate()[0].strip()
-        # Use a regex because the clang output change between platforms.
-        versionStr = re.search('.*?clang version (\d(?:.?\d)?(?:.?\d)?).*', versionMsg).groups()[0]
-        return versionStr
+        # a broken compiler wrapper should not block the build forever
+        versionMsg = subprocess.run([bin, CC['version']], capture_output=True, text=True, timeout=5).stdout.strip()
+        versionStr = _VERSION_RE.search(versionMsg).groups()[0]
     except:
         return 'unknown'
+    if key:
+        _cache.writeVersionCache(name, key, versionStr)
+    return versionStr
 
 
 def setup(ccBinArg, cxxBinArg):
@@ -46,28 +76,28 @@ def setup(ccBinArg, cxxBinArg):
 
     ccVersionStr = retrieveVersion(ccBinArg)
     cxxVersionStr = retrieveVersion(cxxBinArg)
+    CC.clear()
+    dict.update(CC, _DEFAULT_CC)
     if ccVersionStr != cxxVersionStr:
         print("Warning: CC version and CXX version doesn't match: CC version is %s and CXX version is %s\n" % (ccVersionStr, cxxVersionStr))
 
     if ccVersionStr != 'unknown':
-        ccVersion = re.findall(r"\d+", ccVersionStr)[:3]
+        ccVersion = _DIGITS_RE.findall(ccVersionStr)[:3]
         ccVersion = [int(i) for i in ccVersion]
 
     if cxxVersionStr != 'unknown':
-        cxxVersion = re.findall(r"\d+", cxxVersionStr)[:3]
+        cxxVersion = _DIGITS_RE.findall(cxxVersionStr)[:3]
         cxxVersion = [int(i) for i in cxxVersion]
 
     if ccVersion[0]>=4 and ccVersion[1]>1:
-        CC['warning2'].append('-Werror=return-type')
-    #    CC['warning2'].append('-Werror=return-local-addr')
+        CC['warning2'] = CC['warning2'] + ['-Werror=return-type']
+    #    CC['warning2'] = CC['warning2'] + ['-Werror=return-local-addr']
 
     CC['warning3']  = CC['warning2']
     if ccVersion[0]>=4 and ccVersion[1]>1:
-        CC['warning3'].append('-Werror=switch')
+        CC['warning3'] = CC['warning3'] + ['-Werror=switch']
     if ccVersion[0]>=4 and ccVersion[1]>2:
-        CC['warning3'].append('-Werror=enum-compare')
+        CC['warning3'] = CC['warning3'] + ['-Werror=enum-compare']
 
     # "warningX" contains all lower level warnings
-    for i in range(2, 4):
-        CC['warning'+str(i)].extend( CC['warning'+str(i-1)] )
-
+    gcc.cascadeWarnings(CC)
@@ -6,6 +6,29 @@ linux = not windows and not macos
 unix = not windows
 
 
+class FlagsDict(dict):
+    '''
+    Dictionary of compiler flags.
+    Lists of flags are stored as immutable tuples, so they can be safely shared (eg. CC['release'] and CC['optimize']),
+    and are returned as new lists which can be directly used in the SCons environments.
+    '''
+    def __setitem__(self, key, value):
+        if isinstance(value, list):
+            value = tuple(value)
+        dict.__setitem__(self, key, value)
+
+    def __getitem__(self, key):
+        value = dict.__getitem__(self, key)
+        if isinstance(value, tuple):
+            return list(value)
+        return value
+
+    def get(self, key, default=None):
+        if key in self:
+            return self[key]
+        return default
+
+
 name = 'gcc'
 ccBin = 'gcc'
 cxxBin = 'g++'
@@ -13,13 +36,14 @@ linkBin = ccBin
 linkxxBin = cxxBin
 arBin = 'ar'
 ranlibBin = 'ranlib'
+externIncPrefix = '-isystem' # include directories of the external libraries
 ccVersionStr = 'unknown'
 ccVersion = [0,0,0]
 cxxVersionStr = 'unknown'
 cxxVersion = [0,0,0]
 
 
-CC = {}
+CC = FlagsDict()
 CC['version']   = '-dumpversion'
 
 
@@ -61,6 +85,21 @@ CC['warning4'] = ['-Wshadow', '-Winline']
 CC['nowarning'] = ['-w']
 
 
+def cascadeWarnings(cc):
+    '''
+    Make "warning2" and "warning3" of "cc" contain all the lower level warnings (without duplicates),
+    and store all the levels in cc['warnings'], indexed by level (level 0 has no flag).
+    '''
+    levels = [()] + [dict.__getitem__(cc, key) for key in ('warning1', 'warning2', 'warning3', 'warning4')]
+    for i in range(2, 4):
+        levels[i] = tuple(dict.fromkeys( levels[i-1] + levels[i] ))
+    cc['warning2'] = levels[2]
+    cc['warning3'] = levels[3]
+    cc['warnings'] = tuple(levels)
+
+cascadeWarnings(CC)
+
+
 if macos:
     # on macos, the linker is not GNU ld
     CC['sharedNoUndefined'] = ['-Wl,-undefined,error']
@@ -123,8 +162,9 @@ CC['sse4']  = ['-msse4']
 def retrieveVersion(ccBinArg):
     import subprocess
     try:
-        versionStr = subprocess.Popen( [ccBinArg, CC['version']], stdout=subprocess.PIPE, stderr=subprocess.PIPE ).communicate()[0].strip()
-        return versionStr
+        # a broken compiler wrapper should not block the build forever
+        versionStr = subprocess.run( [ccBinArg, CC['version']], capture_output=True, text=True, timeout=5 ).stdout.strip()
+        return versionStr or 'unknown'
     except:
         return 'unknown'
 
@@ -139,22 +179,22 @@ def setup(ccBinArg, cxxBinArg):
         print("Warning: CC version and CXX version doesn't match: CC version is %s and CXX version is %s\n" % (ccVersionStr, cxxVersionStr))
     
     if ccVersionStr != 'unknown':
-        ccVersion = [int(i) for i in ccVersionStr.split('.')]
+        # recent gcc only print the major version (eg. "12")
+        ccVersion = ([int(i) for i in ccVersionStr.split('.')] + [0,0])[:3]
 
     if cxxVersionStr != 'unknown':
-        cxxVersion = [int(i) for i in cxxVersionStr.split('.')]
+        cxxVersion = ([int(i) for i in cxxVersionStr.split('.')] + [0,0])[:3]
 
     if ccVersion[0]>=4 and ccVersion[1]>1:
-        CC['warning2'].append('-Werror=return-type')
-    #    CC['warning2'].append('-Werror=return-local-addr')
+        CC['warning2'] = CC['warning2'] + ['-Werror=return-type']
+    #    CC['warning2'] = CC['warning2'] + ['-Werror=return-local-addr']
 
     CC['warning3']  = CC['warning2']
     if ccVersion[0]>=4 and ccVersion[1]>1:
-        CC['warning3'].append('-Werror=switch')
+        CC['warning3'] = CC['warning3'] + ['-Werror=switch']
     if ccVersion[0]>=4 and ccVersion[1]>2:
-        CC['warning3'].append('-Werror=enum-compare')
+        CC['warning3'] = CC['warning3'] + ['-Werror=enum-compare']
     
     # "warningX" contains all lower level warnings
-    for i in xrange(2, 4):
-        CC['warning'+str(i)].extend( CC['warning'+str(i-1)] )
+    cascadeWarnings(CC)
 
@@ -6,6 +6,7 @@ linkBin = 'link'
 linkxxBin = 'link'
 arBin = ''
 ranlibBin = ''
+externIncPrefix = '/I' # include directories of the external libraries (/external:I is not supported by old versions)
 
 ccVersionStr = 'unknown'
 ccVersion = [0,0,0]
@@ -41,6 +42,8 @@ CC['warning2']  = ['/W2']
 CC['warning3']  = ['/W3']
 CC['warning4']  = ['/W4']
 CC['nowarning'] = ['/w', '/W0']
+# all the levels, indexed by level (level 0 has no flag)
+CC['warnings']  = [[], CC['warning1'], CC['warning2'], CC['warning3'], CC['warning4']]
 
 CC['sharedNoUndefined'] = ['']
 CC['visibilityhidden'] = ['']
@@ -2,8 +2,12 @@
 project package.
 """
 import atexit
+import collections
+import fnmatch
+import functools
 import getpass
 import os
+import re
 import socket
 import string
 import sys
@@ -14,6 +18,57 @@ import SCons
 from .. import autoconf, compiler, utils
 
 
+# displayed by SConsProject.begin with 'scons --help'
+HELP_TEXT = '''
+        -- Build targets --
+            scons                  : build all plugins and programs
+            scons plugins          : build all plugins
+            scons test             : build all tests ('unittest' for c++ tests, 'scripttest' for script tests)
+            scons doc              : build doxygen documentation
+
+        -- SCons options --
+            scons -H               : documentation of SCons itself
+            scons -Q               : making the SCons output less verbose
+            scons -j               : parallel builds
+            scons -i               : continue building after it encounters an error
+            scons --interactive    : to rebuild without reparsing SConscript files
+            scons --tree           : display all or part of the SCons dependency graph
+            scons --debug=presub   : pre-substitution string that SCons uses to generate the command lines it executes
+            scons --debug=findlibs : display what library names SCons is searching for, and in which directories it is searching
+
+        -- Configuration file --
+            If the external library installation is not directly in "/usr/include" and "/usr/lib",
+            you should indicate this information into a "host.sconf" file at the root of the project.
+            For example for jpeg:
+                incdir_jpeg = "/opt/custom/jpeg/include"
+                libdir_jpeg = "/opt/custom/jpeg/lib"
+            If the subdirectories use standard name: "include" and "lib", you could do the same thing with the shortcut:
+                dir_jpeg = "/opt/custom/jpeg"
+            
+            If it's needed you could also override the link libraries:
+                lib_jpeg = ["jpeg_custom", "mt"]
+        '''
+
+
+def getOsBits():
+    '''
+    Returns the number of bits of the operating system (not of the python interpreter, which could be a 32 bits build).
+    '''
+    if hasattr(os, 'uname'):
+        # eg. x86_64, aarch64, arm64
+        return 64 if os.uname()[4].endswith('64') else 32
+    if os.name.lower() == 'nt':
+        return 64 if 'PROGRAMFILES(X86)' in os.environ else 32
+    return 64 if sys.maxsize > 2**32 else 32
+
+# computed once, at import
+osBits = getOsBits()
+
+# compiler paths of the user environment (used by default on windows)
+envIncludePaths = [ p for p in os.environ.get('INCLUDE', '').split(os.pathsep) if p ]
+envLibPaths = [ p for p in os.environ.get('LIB', '').split(os.pathsep) if p ]
+
+
 def join_if_basedir_not_empty( *dirs ):
     '''
     Join directories like standard 'os.path.join' function but with the particular case that if the first directory is empty, the function return an empty string.
@@ -24,6 +79,128 @@ def join_if_basedir_not_empty( *dirs ):
     return os.path.join(*dirs)
 
 
+@functools.lru_cache(maxsize=None)
+def listFileNames( directory ):
+    '''
+    Returns the file names in "directory" as a frozenset (a single directory read instead of a stat call by file),
+    or None if the directory can't be read.
+    The result is cached, so each directory is only read once.
+    '''
+    try:
+        with os.scandir(directory) as entries:
+            return frozenset( e.name for e in entries if e.is_file() )
+    except OSError:
+        return None
+
+def fileExists( directory, filename ):
+    '''
+    Returns if "filename" exists in "directory", using the cached list of the files of "directory".
+    '''
+    names = listFileNames(directory)
+    if names is None:
+        return os.path.exists(os.path.join(directory, filename))
+    return filename in names
+
+@functools.lru_cache(maxsize=4096)
+def readFirstLine( filename ):
+    '''
+    Returns the first line of "filename" (at most 512 bytes), cached because a script could be used by several targets.
+    '''
+    with open(filename, 'rb') as f:
+        return f.readline(512).decode('utf-8', 'replace')
+
+@functools.lru_cache(maxsize=128)
+def patternsMatcher( patterns ):
+    '''
+    Returns a function matching a file name against any of the wildcard "patterns" (tuple),
+    compiled into a single regular expression. Like fnmatch, the case is ignored on windows.
+    Like SCons Glob, hidden files (starting with '.') only match the patterns starting with '.'.
+    '''
+    def translate(p):
+        regex = fnmatch.translate(os.path.normcase(p))
+        return regex if p.startswith('.') else r'(?!\.)' + regex
+    regex = re.compile( '|'.join(map(translate, patterns)) )
+    return lambda name: regex.match(os.path.normcase(name)) is not None
+
+def walkFiles( root, recursive=True ):
+    '''
+    Yields (directory, sorted names of its files) for "root" and, if "recursive", all its sub-directories
+    (excepted CVS directories). The directories are listed with os.scandir and the types of its entries,
+    so there is no stat call per file. Symbolic links to directories are followed.
+    '''
+    directories = [root]
+    while directories:
+        directory = directories.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        names = []
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir():
+                if recursive and entry.name != 'CVS':
+                    subdirs.append(entry.path)
+            else:
+                names.append(entry.name)
+        yield directory, sorted(names)
+        # parent directories first, sub-directories in alphabetical order
+        directories.extend(sorted(subdirs, reverse=True))
+
+def findFiles( root, patterns, recursive=True ):
+    '''
+    Returns the paths of the files in "root" (and its sub-directories if "recursive") matching the wildcard "patterns" (tuple).
+    Only uses the file system, so it can be called from any thread.
+    '''
+    match = patternsMatcher(patterns)
+    files = []
+    for path, names in walkFiles(os.path.normpath(root), recursive):
+        files += [os.path.join(path, n) for n in filter(match, names)]
+    return files
+
+
+# Path computations of the project, cached because they are called from every SConscript
+# with the same arguments. The project directories are part of the arguments.
+
+@functools.lru_cache(maxsize=4096)
+def _realAbsolutePath( topDir, buildDir, cdir, relativePath ):
+    '''See SConsProject.getRealAbsoluteCwd.'''
+    if not relativePath:
+        return cdir
+    if relativePath.startswith('#'):
+        return os.path.join(topDir, relativePath[1:])
+    elif os.path.isabs(relativePath):
+        if relativePath.startswith(buildDir):
+            return os.path.join(topDir, relativePath[len(buildDir)+1:])
+        return relativePath
+    return os.path.join(cdir, relativePath)
+
+@functools.lru_cache(maxsize=4096)
+def _absolutePath( buildDir, cdir, relativePath ):
+    '''See SConsProject.getAbsoluteCwd.'''
+    if not relativePath:
+        return cdir
+    if relativePath.startswith('#'):
+        return os.path.join(buildDir, relativePath[1:])
+    elif os.path.isabs(relativePath):
+        return relativePath
+    return os.path.join(cdir, relativePath)
+
+@functools.lru_cache(maxsize=2048)
+def _cwdParts( topDir, cdir ):
+    '''See SConsProject.getCwdInProject. Returns the path and the tuple of its directories.'''
+    relpath = os.path.relpath(cdir, topDir)
+    return relpath, tuple(relpath.split(os.sep))
+
+@functools.lru_cache(maxsize=4096)
+def _pathInBuildDir( topDir, buildDir, d ):
+    '''See SConsProject.inBuildDir.'''
+    if not d.startswith(buildDir) and d.startswith(topDir):
+        return buildDir + d[len(topDir):]
+    return d
+
+
 class SConsProject:
     '''
     This is a base class helper for SCons build tool.
@@ -92,74 +269,80 @@ class SConsProject:
     compiler          = None
     libs              = autoconf
     commonLibs        = [libs.sconsProject]
-    libs_error        = [] # list of libraries with autoconf error
-    allLibsChecked    = [] # temporary list of librairies already checked
+    libs_error        = {} # libraries with autoconf error (by id, in error order)
+    allLibsChecked    = set() # temporary set of librairies already checked
+    _needConfigure    = None # cache of needConfigure()
     removedFromDefaultTargets = {}
-    env               = SCons.Environment.Environment( tools=[
-                                            'packaging',
-                                            'doxygen',
-                                            'unittest',
-                                            'scripttest',
-                                            ] + (['msvs'] if windows else []),
-                                         toolpath=[os.path.join(dir_sconsProject, '..', 'tools')] )
 
     allVisualProjects = []
 
+    # colors of the display (options "color_<name>"), only defaultColors have a color by default
+    colorNames = ('clear', 'red', 'redB', 'green', 'blue', 'blueB', 'yellow', 'brown', 'violet',
+                  'autoconf', 'header', 'title', 'compile', 'link', 'install',
+                  'info', 'success', 'warning', 'fail', 'error')
+    # values of all the color options when the colors are disabled
+    noColors = dict.fromkeys(['color_'+c for c in colorNames], '')
+    # headers added to the visual projects of the targets, with the files rejected by default
+    headerPatterns = ('*.h', '*.hpp', '*.tcc', '*.inl', '*.H')
+    headerReject = ('@', '_qrc', '_ui', '.moc.cpp')
+    # output directories (attribute "dir_output_<name>") and their sub-directory in the installation directory
+    outputSubDirs = (('bin', 'bin'), ('lib', 'lib'), ('plugin', 'plugin'), ('header', 'include'), ('test', 'test'))
+
+    # names of the configuration files (without the ".sconf" extension), by priority (the last one overrides the others):
+    # in the sconsProject directory
+    sconfSConsProject = ('display', 'default')
+    # in the project directory (followed by the hostname, 'user', the user name and 'finalize')
+    sconfBase = ('display', 'default', 'local', 'host')
+    sconfPlatform = ( (('unix', 'unix-%d' % osBits) if unix else ()) +
+                      (('linux', 'linux-%d' % osBits) if linux else
+                       ('macos', 'macos-%d' % osBits) if macos else
+                       ('windows', 'windows-%d' % osBits) if windows else ()) )
+
+    defaultColors = frozenset(('clear', 'red', 'redB', 'green', 'blue', 'blueB', 'yellow', 'brown', 'violet', 'error'))
+
     def __init__(self):
         '''
         Initialisation of variables depending on computer.
         '''
+        # the main environment is only created with the project (not at import)
+        self.env = SCons.Environment.Environment( tools=[
+                                            'packaging',
+                                            'doxygen',
+                                            'unittest',
+                                            'scripttest',
+                                            ] + (['msvs'] if self.windows else []),
+                                         toolpath=[os.path.join(self.dir_sconsProject, '..', 'tools')] )
         self.allTargets = {}
+        # flags added by the libraries during a configure pass (by environment), see applyPendingEnv
+        self._pendingAppend = collections.defaultdict(lambda: collections.defaultdict(list))
+        self._pendingPrepend = collections.defaultdict(lambda: collections.defaultdict(list))
+        # dependencies of lists of libraries, see findLibsDependencies
+        self._depsCache = {}
+        # files found by scanFiles (by directory and patterns), the source trees don't change during the parsing
+        self._scanCache = {}
+        # configured environments by list of libraries, see createEnv
+        self._envCache = {}
+        self._checkEnvs = {} # check environments created by preProbe, by library id
+        # CPPPATH converted to strings for the visual projects, see MSVSProject
+        self._cpppathStrCache = {}
         if self.windows:
             self.packagetype    = 'msi'
         else:
             self.packagetype    = 'rpm'
 
-        if self.unix:
-            if (os.uname()[4][-3:] == '_64'):
-                self.bits = 64
-            else:
-                self.bits = 32
-        elif self.windows:
-            if 'PROGRAMFILES(X86)' not in os.environ:
-                self.bits = 32
-            else:
-                self.bits = 64
+        self.bits = osBits
 
-        sconf = [
-            'display',
-            'default',
-            'local',
-            'host',
-            ]
-        if self.unix:
-            sconf.append( 'unix' )
-            sconf.append( 'unix-'+str(self.bits) )
-        if self.linux:
-            sconf.append( 'linux' )
-            sconf.append( 'linux-'+str(self.bits) )
-        elif self.macos:
-            sconf.append( 'macos' )
-            sconf.append( 'macos-'+str(self.bits) )
-        elif self.windows:
-            sconf.append( 'windows' )
-            sconf.append( 'windows-'+str(self.bits) )
-        sconf.append( self.hostname )
-        sconf.append( 'user' )
-        sconf.append( self.user )
-        sconf.append( 'finalize' )
-
-        sconf_sconsProject = ['display', 'default']
-
-        self.sconf_files = [
-                             os.path.join(self.dir_sconsProject, '..', s)+'.sconf' for s in sconf_sconsProject
-                           ] + [
-                             os.path.join(self.dir, s)+'.sconf' for s in sconf
-                           ]
-        self.sconf_files = [ f for f in self.sconf_files if os.path.exists(f) ]
+        sconf = self.sconfBase + self.sconfPlatform + (self.hostname, 'user', self.user, 'finalize')
+
+        # read each directory once instead of checking each file (slow on NFS/Samba)
+        self.sconf_files = [ os.path.join(d, s)+'.sconf'
+                             for d, names in ((os.path.join(self.dir_sconsProject, '..'), self.sconfSConsProject), (self.dir, sconf))
+                             for s in names
+                             if fileExists(d, s+'.sconf') ]
 
         #if self.windows:
-        self.env['ENV']['PATH'] = os.environ['PATH'] # access to the compiler (if not in '/usr/bin')
+        if self.env['ENV'].get('PATH') != os.environ['PATH']:
+            self.env['ENV']['PATH'] = os.environ['PATH'] # access to the compiler (if not in '/usr/bin')
 
         # scons optimizations...
         # http://www.scons.org/wiki/GoFastButton
@@ -175,10 +358,15 @@ class SConsProject:
         SCons.Script.SetOption('implicit_cache', 1)
         # By default SCons will calculate the MD5 checksum of every source file in your build each time it is run, and will only cache the checksum after the file is 2 days old. This default of 2 days is to protect from clock skew from NFS or revision control systems. You can tweak this delay using --max-drift=SECONDS where SECONDS is some number of seconds. Decreasing SECONDS can improve build speed by eliminating superfluous MD5 checksum calculations.
         SCons.Script.SetOption('max_drift', 60 * 15) # cache the checksum after max_drift seconds
+        # (the decider, max_drift and implicit_cache can be changed by the user with the options of the same name)
         # Normally you tell Scons about include directories by setting the CPPPATH construction variable, which causes SCons to search those directories when doing implicit dependency scans and also includes those directories in the compile command line. If you have header files that never or rarely change (e.g. system headers, or C run-time headers), then you can exclude them from CPPPATH and include them in the CCFLAGS construction variable instead, which causes SCons to ignore those include directories when scanning for implicit dependencies. Carefully tuning the include directories in this way can usually result in a dramatic speed increase with very little loss of accuracy.
         # To achieve this we add a new variable 'EXTERNCPPPATH' which is the same as CPPPATH but without searching for implicit dependencies in those directories. So we always use EXTERNCPPPATH for external libraries.
+        # The EXTERNCPPPATH directories are also given to the compiler as system directories (-isystem with gcc and clang),
+        # so the compiler doesn't report warnings from external headers. The prefix is set by the selected compiler.
+        # (Don't add the default system directories of the compiler like /usr/include in EXTERNCPPPATH.)
+        self.env['EXTERNINCPREFIX'] = '$INCPREFIX'
         self.env['_CPPINCFLAGS'] = '$( ${_concat(INCPREFIX, CPPPATH,       INCSUFFIX, __env__, RDirs, TARGET, SOURCE)} ' \
-                                   '${_concat(INCPREFIX, EXTERNCPPPATH, INCSUFFIX, __env__, RDirs, TARGET, SOURCE)} $)'
+                                   '${_concat(EXTERNINCPREFIX, EXTERNCPPPATH, INCSUFFIX, __env__, RDirs, TARGET, SOURCE)} $)'
         self.env['_join_if_basedir_not_empty'] = join_if_basedir_not_empty
 
 
@@ -187,47 +375,52 @@ class SConsProject:
         '''
         Print information at compilation's begining.
         '''
-        sys.stdout.write(self.env['color_info'])
-        print(':' * 80)
-        print('::' + ' '*32, self.env['mode'], 'mode')
-        print(':' * 80)
-        print(':: dir                = ' + self.dir)
-        print(':: dir_output_build   = ' + self.dir_output_build)
-        print(':: dir_output_bin     = ' + self.dir_output_bin)
-        print(':: dir_output_plugin  = ' + self.dir_output_plugin)
-        print(':: dir_output_lib     = ' + self.dir_output_lib)
-        print(':: dir_output_test    = ' + self.dir_output_test)
-        print(':: dir_sconsProject   = ' + self.dir_sconsProject)
-        print(':: now                = ' + self.now)
-        print(':: osname             = ' + self.osname)
-        print(':: sysplatform        = ' + self.sysplatform)
-        print(':: hostname           = ' + self.hostname)
-        print(':: compiler c         = %s (%s)' % (self.env['CC'], self.env['CCVERSION']))
-        print(':: compiler c++       = %s (%s)' % (self.env['CXX'], self.env['CXXVERSION']))
-        print(':: parallel jobs      = %d' % (SCons.Script.GetOption('num_jobs')))
-        if self.env['ccache']:
-            print(':: ccachedir          = ' + self.env['ccachedir'])
-        print(':' * 80)
-        sys.stdout.write(self.env['color_clear'])
+        env = self.env
+        lines = [
+            ':' * 80,
+            '::' + ' '*32 + ' %s mode' % env['mode'],
+            ':' * 80,
+            ':: dir                = ' + self.dir,
+            ':: dir_output_build   = ' + self.dir_output_build,
+            ':: dir_output_bin     = ' + self.dir_output_bin,
+            ':: dir_output_plugin  = ' + self.dir_output_plugin,
+            ':: dir_output_lib     = ' + self.dir_output_lib,
+            ':: dir_output_test    = ' + self.dir_output_test,
+            ':: dir_sconsProject   = ' + self.dir_sconsProject,
+            ':: now                = ' + self.now,
+            ':: osname             = ' + self.osname,
+            ':: sysplatform        = ' + self.sysplatform,
+            ':: hostname           = ' + self.hostname,
+            ':: compiler c         = %s (%s)' % (env['CC'], env['CCVERSION']),
+            ':: compiler c++       = %s (%s)' % (env['CXX'], env['CXXVERSION']),
+            ':: parallel jobs      = %d' % (SCons.Script.GetOption('num_jobs')),
+            ]
+        if env['ccache']:
+            lines.append(':: ccachedir          = ' + env['ccachedir'])
+        lines.append(':' * 80)
+        # a single write for the whole block
+        sys.stdout.write(env['color_info'] + '\n'.join(lines) + '\n' + env['color_clear'])
 
     def printEnv(self, env=None, keys=[]):
         '''
         Debug function to display all environement options.
         '''
+        write = sys.stdout.write
+        colorInfo = self.env['color_info']
         if not env:
             print(':' * 20, ' env ', ':' * 20)
             env = self.env
         if not keys:
-            sys.stdout.write(self.env['color_info'])
+            write(colorInfo)
             print(env.Dump())
         else:
             print('*' * 50, 'keys: ', keys)
             dict = env.Dictionary()
             for key in keys:
                 if key in dict:
-                    sys.stdout.write(self.env['color_info'])
+                    write(colorInfo)
                     print(':' * 10, ' %s = %s' % (key, dict[key]))
-        sys.stdout.write(self.env['color_clear'])
+        write(self.env['color_clear'])
 
     def getAllAbsoluteCwd(self, relativePath=None):
         '''
@@ -268,19 +461,10 @@ class SConsProject:
         '''
         if isinstance(relativePath, list):
             return [self.getRealAbsoluteCwd(rp) for rp in relativePath]
+        if isinstance(relativePath, SCons.Node.FS.Dir):
+            return relativePath.srcnode().abspath
         cdir = SCons.Script.Dir('.').srcnode().abspath
-        if relativePath:
-            if isinstance(relativePath, SCons.Node.FS.Dir):
-                return relativePath.srcnode().abspath
-            elif relativePath.startswith('#'):
-                return os.path.join(self.dir, relativePath[1:])
-            elif os.path.isabs(relativePath):
-                if relativePath.startswith(self.dir_output_build):
-                    return os.path.join(self.dir, relativePath[len(self.dir_output_build)+1:])
-                return relativePath
-            return os.path.join(cdir, relativePath)
-        else:
-            return cdir
+        return _realAbsolutePath(self.dir, self.dir_output_build, cdir, relativePath)
 
     def getAbsoluteCwd(self, relativePath=None):
         '''
@@ -290,139 +474,109 @@ class SConsProject:
         if isinstance(relativePath, list):
             return [self.getAbsoluteCwd(rp) for rp in relativePath]
         cdir = SCons.Script.Dir('.').abspath
-        if relativePath:
-            if relativePath.startswith('#'):
-                return os.path.join(self.dir_output_build, relativePath[1:])
-            elif os.path.isabs(relativePath):
-                return relativePath
-            return os.path.join(cdir, relativePath)
-        else:
-            return cdir
+        return _absolutePath(self.dir_output_build, cdir, relativePath)
 
     def getCwdInProject(self):
         cdir = SCons.Script.Dir('.').srcnode().abspath
-        return os.path.relpath(cdir, self.dir)
+        return _cwdParts(self.dir, cdir)[0]
 
-    def getSubDirsAbsolutePath(self, current_dir=None):
-        '''Returns sub-directories with absolute paths (in original file tree).'''
+    def getCwdPartsInProject(self):
+        '''Returns the directories of the current directory in the project, as a tuple.'''
+        cdir = SCons.Script.Dir('.').srcnode().abspath
+        return _cwdParts(self.dir, cdir)[1]
+
+    def getSubDirsEntries(self, current_dir=None):
+        '''
+        Returns the os.DirEntry of the non-hidden sub-directories (in original file tree).
+        The type of the entries comes from the directory read, so there is no stat call by entry.
+        '''
         if current_dir == None:
             current_dir = self.getRealAbsoluteCwd()
         else:
-            current_dir = Dir('./' + current_dir).srcnode().abspath
+            current_dir = SCons.Script.Dir('./' + current_dir).srcnode().abspath
+
+        with os.scandir(current_dir) as entries:
+            # skip hidden directories and directories containing '@'
+            return [ e for e in entries if not e.name.startswith('.') and '@' not in e.name and e.is_dir() ]
 
-        files = (os.listdir(current_dir)) # relative paths (only directories names)
-        #files.append(current_dir)
-        nonhidden = (f for f in files if f[0] != '.' and f.find('@'))
-        absfiles = (os.path.join(current_dir, f) for f in nonhidden) # absolute paths
-        dirs = (f for f in absfiles if os.path.isdir(f))
-        return dirs
+    def getSubDirsAbsolutePath(self, current_dir=None):
+        '''Returns sub-directories with absolute paths (in original file tree).'''
+        return [ e.path for e in self.getSubDirsEntries(current_dir) ]
 
     def getSubDirs(self, current_dir=None):
         '''Returns sub-directories with relative paths (in original file tree).'''
-        return map(os.path.basename, self.getSubDirsAbsolutePath(current_dir)) # absolute path -> relative path (for variant_dir)
+        return [ e.name for e in self.getSubDirsEntries(current_dir) ] # relative path (for variant_dir)
 
     def getSubDirsWithSConscript(self):
         '''Returns sub-directories containing a SConscript file with relative paths (in original file tree).'''
-        alldirs = self.getSubDirsAbsolutePath()
-        dirs = (f for f in alldirs if os.path.isfile(os.path.join(f, 'SConscript')))
-        ldirs = map(os.path.basename, dirs) # absolute path -> relative path (for variant_dir)
-        return ldirs
+        return [ e.name for e in self.getSubDirsEntries() if os.path.isfile(os.path.join(e.path, 'SConscript')) ]
 
     def inBuildDir(self, * dirs):
         '''Returns "dirs" as subdirectories of temporary "buildDir".'''
         if not dirs:
-            return os.getcwd().replace(self.dir, self.dir_output_build, 1)
+            return _pathInBuildDir(self.dir, self.dir_output_build, os.getcwd())
         if len(dirs) == 1 and isinstance(dirs[0], str):
+            return _pathInBuildDir(self.dir, self.dir_output_build, dirs[0])
+        topDir, buildDir = self.dir, self.dir_output_build
+        return [ _pathInBuildDir(topDir, buildDir, d) for d in SCons.Util.flatten(dirs) ]
+
+    @staticmethod
+    def _inDir(base, dirs):
+        '''
+        Returns "dirs" as subdirectories of "base", in a single pass over the flattened "dirs".
+        Returns "base" if "dirs" is empty, a single path for a single directory and a list otherwise.
+        Absolute paths and SCons nodes are returned unchanged.
+        '''
+        if not dirs:
+            return base
+        Base, join = SCons.Node.FS.Base, os.path.join
+        if len(dirs) == 1 and not SCons.Util.is_Sequence(dirs[0]):
             d = dirs[0]
-            if not d.startswith(self.dir_output_build):
-                return d.replace(self.dir, self.dir_output_build, 1)
-            else:
-                return d
-        l_dirs = SCons.Util.flatten(dirs)
-        return [ self.inBuildDir(d) for d in l_dirs ]
+            return d if isinstance(d, Base) else join(base, d)
+        return [ d if isinstance(d, Base) else join(base, d) for d in SCons.Util.flatten(dirs) ]
 
     def inTopDir(self, * dirs):
         '''Returns "dirs" as subdirectories of "topDir".'''
-        if not dirs:
-            return self.dir
-        if len(dirs) == 1:
-            if issubclass(dirs[0].__class__, SCons.Node.FS.Base):
-                return dirs[0]
-            elif isinstance(dirs[0], str):
-                if os.path.isabs( dirs[0] ):
-                    return dirs[0]
-                return os.path.join(self.inTopDir(), dirs[0])
-        l_dirs = SCons.Util.flatten(dirs)
-        return [ self.inTopDir(d) for d in l_dirs ]
+        return self._inDir(self.dir, dirs)
 
     def inOutputDir(self, *dirs):
         '''Returns "dirs" as subdirectories of "outputDir".'''
-        if not dirs:
-            return self.dir_output
-        if len(dirs) == 1 and isinstance(dirs[0], str):
-            return os.path.join( self.inOutputDir(), dirs[0] )
-        l_dirs = SCons.Util.flatten(dirs)
-        return [ self.inOutputDir(d) for d in l_dirs ]
+        return self._inDir(self.dir_output, dirs)
 
     def inOutputLib(self, *dirs):
         '''Returns "dirs" as subdirectories of "outputLib".'''
-        if not dirs:
-            return self.dir_output_lib
-        if len(dirs) == 1 and isinstance(dirs[0], str):
-            return os.path.join( self.inOutputLib(), dirs[0] )
-        l_dirs = SCons.Util.flatten(dirs)
-        return [ self.inOutputLib(d) for d in l_dirs ]
+        return self._inDir(self.dir_output_lib, dirs)
 
     def inOutputHeaders(self, *dirs):
         '''Returns "dirs" as subdirectories of "outputHeaders".'''
-        if not dirs:
-            return self.dir_output_header
-        if len(dirs) == 1 and isinstance(dirs[0], str):
-            return os.path.join( self.inOutputHeaders(), dirs[0] )
-        l_dirs = SCons.Util.flatten(dirs)
-        return [ self.inOutputHeaders(d) for d in l_dirs ]
+        return self._inDir(self.dir_output_header, dirs)
 
     def inOutputBin(self, *dirs):
         '''Returns "dirs" as subdirectories of "outputBin".'''
-        if not dirs:
-            return self.dir_output_bin
-        if len(dirs) == 1 and isinstance(dirs[0], str):
-            return os.path.join( self.inOutputBin(), dirs[0] )
-        l_dirs = SCons.Util.flatten(dirs)
-        return [ self.inOutputBin(d) for d in l_dirs ]
+        return self._inDir(self.dir_output_bin, dirs)
 
     def inOutputPlugin(self, *dirs):
         '''Returns "dirs" as subdirectories of "outputPlugin".'''
-        if not dirs:
-            return self.dir_output_plugin
-        if len(dirs) == 1 and isinstance(dirs[0], str):
-            return os.path.join( self.inOutputPlugin(), dirs[0] )
-        l_dirs = SCons.Util.flatten(dirs)
-        return [ self.inOutputPlugin(d) for d in l_dirs ]
+        return self._inDir(self.dir_output_plugin, dirs)
 
     def inOutputTest(self, *dirs):
         '''Returns "dirs" as subdirectories of "outputTest".'''
-        if not dirs:
-            return self.dir_output_test
-        if len(dirs) == 1 and isinstance(dirs[0], str):
-            return os.path.join( self.inOutputTest(), dirs[0] )
-        l_dirs = SCons.Util.flatten(dirs)
-        return [ self.inOutputTest(d) for d in l_dirs ]
+        return self._inDir(self.dir_output_test, dirs)
 
     def getName(self, n=1):
         '''Create a name using the current directory. "n" is the number of parents to build the name.'''
-        v = self.getCwdInProject().split(os.sep)
+        v = self.getCwdPartsInProject()
         if n == 0:
             return '_'.join( v )
         return '_'.join( v[-n:] )
 
     def getDirs(self, n=1):
         '''Create a list of upper directories. "n" is the number of parents.'''
-        alldirs = self.getCwdInProject().split(os.sep)
+        alldirs = self.getCwdPartsInProject()
         if isinstance( n, list ):
             return [alldirs[i] for i in n]
         else:
-            return alldirs[-n:]
+            return list(alldirs[-n:])
 
         def convertSconsPathToStr(self, *dirs):
                 '''Returns "dirs" as str.'''
@@ -436,7 +590,10 @@ class SConsProject:
 
     def needConfigure(self):
         '''If the target builds nothing, we don't need to call the configure function.'''
-        return not SCons.Script.GetOption('clean') and not SCons.Script.GetOption('help')
+        # the command line options don't change during the run
+        if self._needConfigure is None:
+            self._needConfigure = not SCons.Script.GetOption('clean') and not SCons.Script.GetOption('help')
+        return self._needConfigure
 
     def needCheck(self):
         '''If we check all libraries before compiling.'''
@@ -468,8 +625,11 @@ class SConsProject:
 
         # select the environment from user options
         compilerName = self.env['compiler']
-        self.compiler = eval( 'compiler.' + compilerName )
+        if compilerName not in compiler.compilers:
+            raise ValueError( 'Unknown compiler "%s", available compilers are: %s' % (compilerName, ', '.join(sorted(compiler.compilers))) )
+        self.compiler = compiler.compilers[compilerName]
         self.CC = self.compiler.CC
+        self.env['EXTERNINCPREFIX'] = self.compiler.externIncPrefix
 
         if 'icecc' in self.env['CC']:
             self.compiler.setup(self.env['ICECC_CC'], self.env['ICECC_CXX'])
@@ -502,65 +662,88 @@ class SConsProject:
             return '%s%s%s  %s\n%s(default=%s, actual=%s)\n\n' % (self.env['color_title'], opt, self.env['color_clear'], multilineHelp, alignment, default, actual)
         opts.FormatVariableHelpText = help_format
 
-        opts.Add(SCons.Script.EnumVariable('mode', 'Compilation mode', 'production', allowed_values=self.modes))
-        opts.Add(SCons.Script.BoolVariable('install', 'Install', False))
-        opts.Add(SCons.Script.BoolVariable('profile', 'Build with profiling support', False))
-        opts.Add(SCons.Script.BoolVariable('cover', 'Build with cover support', False))
-        opts.Add(SCons.Script.BoolVariable('clean', 'Remove all the build directory', False))
-        opts.Add(SCons.Script.BoolVariable('ignore_configure_errors', 'Ignore "configure" errors. The default target will only build the possible targets', False))
-#        opts.Add( BoolVariable( 'log',           'Enable output to a log file',                     False ) )
-        opts.Add(SCons.Script.BoolVariable('ccache', 'Enable compiler cache system (ccache style)', False))
-        opts.Add(SCons.Script.PathVariable('ccachedir', 'Cache directory', 'ccache', SCons.Script.PathVariable.PathAccept))
-        opts.Add(SCons.Script.BoolVariable('colors', 'Using colors of the terminal', True if not self.windows else False))
-        opts.Add('default', 'Default objects to build', 'all')
-        opts.Add('aliases', 'A list of custom aliases.', [])
-        opts.Add('jobs', 'Parallel jobs', '1')
-        opts.Add(SCons.Script.BoolVariable('check_libs', 'Enable/Disable lib checking', True))
-        opts.Add('SHLIBSUFFIX', 'Specify the shared libraries suffix', '.dll' if self.windows else( '.dylib' if self.macos else '.so' ) )
-        opts.Add('CC', 'Specify the C Compiler', self.compiler.ccBin)
-        opts.Add('CXX', 'Specify the C++ Compiler', self.compiler.cxxBin)
-        opts.Add('AR', 'Specify the C Compiler', self.compiler.arBin)
-        opts.Add('RANLIB', 'Specify the C++ Compiler', self.compiler.ranlibBin)
-
-        opts.Add('SCRIPTTESTXX', 'Specify the script test binary', "nosetests")
-        opts.Add('SCRIPTTESTFLAGS', 'Specify the script test flags', "--detailed-errors --process-timeout=60 --nocapture")
-
-        opts.Add('ENVINC', 'Additional include path (at compilation)', [] if not self.windows else os.environ.get('INCLUDE', '').split(':'))
-        opts.Add('ENVPATH', 'Additional bin path (at compilation)', [])
-        opts.Add('ENVLIBPATH', 'Additional librairie path (at compilation)', [] if not self.windows else os.environ.get('LIB', '').split(':'))
+        opts.AddVariables(
+            SCons.Script.EnumVariable('mode', 'Compilation mode', 'production', allowed_values=self.modes),
+            SCons.Script.BoolVariable('install', 'Install', False),
+            SCons.Script.BoolVariable('profile', 'Build with profiling support', False),
+            SCons.Script.BoolVariable('cover', 'Build with cover support', False),
+            SCons.Script.BoolVariable('clean', 'Remove all the build directory', False),
+            SCons.Script.BoolVariable('ignore_configure_errors', 'Ignore "configure" errors. The default target will only build the possible targets', False),
+#            SCons.Script.BoolVariable('log', 'Enable output to a log file', False),
+            SCons.Script.BoolVariable('ccache', 'Enable compiler cache system (ccache style)', False),
+            SCons.Script.PathVariable('ccachedir', 'Cache directory', 'ccache', SCons.Script.PathVariable.PathAccept),
+            SCons.Script.BoolVariable('colors', 'Using colors of the terminal', True if not self.windows else False),
+            ('default', 'Default objects to build', 'all'),
+            ('aliases', 'A list of custom aliases.', []),
+            ('jobs', 'Parallel jobs, 0 to use jobs_factor jobs per cpu', '0'),
+            ('jobs_factor', 'Number of parallel jobs per cpu if jobs is 0 (eg. 1.5 if the compilation waits for the disk)', '1'),
+            SCons.Script.EnumVariable('decider', 'How to decide if a file changed.\n'
+                                                 'MD5-timestamp: compute the MD5 checksum only if the timestamp changed.\n'
+                                                 'timestamp-newer: only use the timestamps (fastest).\n'
+                                                 'MD5: always compute the checksum (slowest)',
+                                      'MD5-timestamp', allowed_values=('MD5-timestamp', 'timestamp-newer', 'MD5')),
+            ('max_drift', 'The checksum of a file is cached after max_drift seconds.\n'
+                          'The default value protects from clock skew with network file systems, use 1 on a local disk.\n'
+                          'Use --implicit-deps-changed to scan the implicit dependencies again', '900'),
+            SCons.Script.BoolVariable('implicit_cache', 'Cache the implicit dependencies (the included files found by the scanners) between builds.\n'
+                                                       'The cache is invalidated if the global include paths or defines change,\n'
+                                                       'use --implicit-deps-changed after other changes of the include paths', True),
+            SCons.Script.BoolVariable('fast_swig_build', 'Compile the swig bindings without optimization (faster builds, slower bindings)', False),
+            SCons.Script.BoolVariable('use_scons_glob', 'Search the source files with the SCons Glob (slower, but also finds the files\n'
+                                                       'which are only declared as targets) instead of reading the directories', False),
+            SCons.Script.BoolVariable('check_libs', 'Enable/Disable lib checking', True),
+            SCons.Script.BoolVariable('parallel_probe', 'Compile the configure tests in parallel before the checks of SCons (gcc and clang only).\n'
+                                                       'The checks are run twice, so only enable it if the checks of the libraries have no side effect', False),
+            ('SHLIBSUFFIX', 'Specify the shared libraries suffix', '.dll' if self.windows else( '.dylib' if self.macos else '.so' ) ),
+            ('CC', 'Specify the C Compiler', self.compiler.ccBin),
+            ('CXX', 'Specify the C++ Compiler', self.compiler.cxxBin),
+            ('AR', 'Specify the C Compiler', self.compiler.arBin),
+            ('RANLIB', 'Specify the C++ Compiler', self.compiler.ranlibBin),
+
+            ('SCRIPTTESTXX', 'Specify the script test binary', "nosetests"),
+            ('SCRIPTTESTFLAGS', 'Specify the script test flags', "--detailed-errors --process-timeout=60 --nocapture"),
+
+            ('ENVINC', 'Additional include path (at compilation)', [] if not self.windows else envIncludePaths),
+            ('ENVPATH', 'Additional bin path (at compilation)', []),
+            ('ENVLIBPATH', 'Additional librairie path (at compilation)', [] if not self.windows else envLibPaths),
+        )
 
         if self.windows:
             opts.Add(SCons.Script.PathVariable('PROGRAMFILES', 'Program Files directory',
                                os.environ.get('PROGRAMFILES', ''),
                                SCons.Script.PathVariable.PathAccept))
 
-        opts.Add('CPPPATH', 'Additional preprocessor paths', [])
-        opts.Add('CPPDEFINES', 'Additional preprocessor defines', [])
-        opts.Add('LIBPATH', 'Additional library paths', [])
-        opts.Add('LIBS', 'Additional libraries', [])
-        # Don't explicitly put include directory arguments in CCFLAGS or CXXFLAGS
-        # because the result will be non-portable and the directories will not
-        # be searched by the dependency scanner.
-        opts.Add('CCFLAGS', 'Additional C and C++ flags', [])
-        opts.Add('CFLAGS', 'Additional C flags', [])
-        opts.Add('CXXFLAGS', 'Additional C++ flags', [])
-        opts.Add('LINKFLAGS', 'Additional linker flags', [])
-
-        opts.Add('ICECC_CC', 'Compilator', self.compiler.ccBin)
-        opts.Add('ICECC_CXX', 'Compilator', self.compiler.cxxBin)
-        opts.Add('ICECC_VERSION', 'Compilator', '')
+        opts.AddVariables(
+            ('CPPPATH', 'Additional preprocessor paths', []),
+            ('CPPDEFINES', 'Additional preprocessor defines', []),
+            ('LIBPATH', 'Additional library paths', []),
+            ('LIBS', 'Additional libraries', []),
+            # Don't explicitly put include directory arguments in CCFLAGS or CXXFLAGS
+            # because the result will be non-portable and the directories will not
+            # be searched by the dependency scanner.
+            ('CCFLAGS', 'Additional C and C++ flags', []),
+            ('CFLAGS', 'Additional C flags', []),
+            ('CXXFLAGS', 'Additional C++ flags', []),
+            ('LINKFLAGS', 'Additional linker flags', []),
+
+            ('ICECC_CC', 'Compilator', self.compiler.ccBin),
+            ('ICECC_CXX', 'Compilator', self.compiler.cxxBin),
+            ('ICECC_VERSION', 'Compilator', ''),
+        )
 
         buildDirName = '.dist' # base dir name for all intermediate compilation objects
         distDirName = 'dist'   # base dir name for output build
-        opts.Add(SCons.Script.PathVariable('BUILDPATH', 'Top directory of compilation tree',
-                           self.dir, SCons.Script.PathVariable.PathIsDir))
-        opts.Add('BUILDDIRNAME', 'Top directory of compilation tree', buildDirName)
-        opts.Add(SCons.Script.PathVariable('DISTPATH', 'Top directory to output compiled files',
-                           self.dir, SCons.Script.PathVariable.PathIsDir))
-        opts.Add('DISTDIRNAME', 'Directory name to output compiled files', distDirName)
-        opts.Add(SCons.Script.PathVariable('INSTALLPATH', 'Top directory to install compiled files',
-                           '${DISTPATH}/${DISTDIRNAME}',
-                           SCons.Script.PathVariable.PathIsDirCreate))
+        opts.AddVariables(
+            SCons.Script.PathVariable('BUILDPATH', 'Top directory of compilation tree',
+                      self.dir, SCons.Script.PathVariable.PathIsDir),
+            ('BUILDDIRNAME', 'Top directory of compilation tree', buildDirName),
+            SCons.Script.PathVariable('DISTPATH', 'Top directory to output compiled files',
+                      self.dir, SCons.Script.PathVariable.PathIsDir),
+            ('DISTDIRNAME', 'Directory name to output compiled files', distDirName),
+            SCons.Script.PathVariable('INSTALLPATH', 'Top directory to install compiled files',
+                      '${DISTPATH}/${DISTDIRNAME}',
+                      SCons.Script.PathVariable.PathIsDirCreate),
+        )
 
         return opts
 
@@ -568,55 +751,37 @@ class SConsProject:
         '''
         Define basics options which don't need to be visible in the help.
         '''
-        opts.Add(SCons.Script.PathVariable('TOPDIR', 'Top directory', self.dir))
-
-        opts.Add('osname', 'OS name', 'windows' if self.windows else 'unix')
-        opts.Add('osbits', 'OS bits', self.bits)
-        opts.Add(SCons.Script.BoolVariable('unix', 'operating system', self.unix))
-        opts.Add(SCons.Script.BoolVariable('linux', 'operating system', self.linux))
-        opts.Add(SCons.Script.BoolVariable('windows', 'operating system', self.windows))
-        opts.Add(SCons.Script.BoolVariable('macos', 'operating system', self.macos))
-        opts.Add('compiler', 'Choose compiler mode. This defines all flag system to use.', 'visual' if self.windows else 'gcc')
-
-        opts.Add('EXTERNCPPPATH', 'Additional preprocessor paths (like CPPPATH but without dependencies check)', [])
-
-        # display options
-        opts.Add('SHCCCOMSTR', 'display option', '$SHCCCOM')
-        opts.Add('SHCXXCOMSTR', 'display option', '$SHCXXCOM')
-        opts.Add('SHLINKCOMSTR', 'display option', '$SHLINKCOM')
-        opts.Add('CCCOMSTR', 'display option', '$CCCOM')
-        opts.Add('CXXCOMSTR', 'display option', '$CXXCOM')
-        opts.Add('LINKCOMSTR', 'display option', '$LINKCOM')
-        opts.Add('ARCOMSTR', 'display option', '$ARCOM')
-        opts.Add('INSTALLSTR', 'display option', 'Install file: $SOURCE as $TARGET')
-        opts.Add('SWIG', 'swig binary', 'swig')
-        opts.Add('SWIGCOMSTR', 'display option', '$SWIGCOM')
-        opts.Add('QT_MOCFROMCXXCOMSTR', 'display option', '$QT_MOCFROMCXXCOM')
-        opts.Add('QT_MOCFROMHCOMSTR', 'display option', '$QT_MOCFROMHCOM')
-        opts.Add('QT_UICCOMSTR', 'display option', '$QT_UICCOM')
-
-        opts.Add('color_clear', 'color', utils.colors.colors['clear'])
-        opts.Add('color_red', 'color', utils.colors.colors['red'])
-        opts.Add('color_redB', 'color', utils.colors.colors['redB'])
-        opts.Add('color_green', 'color', utils.colors.colors['green'])
-        opts.Add('color_blue', 'color', utils.colors.colors['blue'])
-        opts.Add('color_blueB', 'color', utils.colors.colors['blueB'])
-        opts.Add('color_yellow', 'color', utils.colors.colors['yellow'])
-        opts.Add('color_brown', 'color', utils.colors.colors['brown'])
-        opts.Add('color_violet', 'color', utils.colors.colors['violet'])
-
-        opts.Add('color_autoconf', 'color', '')
-        opts.Add('color_header', 'color', '')
-        opts.Add('color_title', 'color', '')
-        opts.Add('color_compile', 'color', '')
-        opts.Add('color_link', 'color', '')
-        opts.Add('color_install', 'color', '')
-
-        opts.Add('color_info', 'color', '')
-        opts.Add('color_success', 'color', '')
-        opts.Add('color_warning', 'color', '')
-        opts.Add('color_fail', 'color', '')
-        opts.Add('color_error', 'color', utils.colors.colors['error'])
+        opts.AddVariables(
+            SCons.Script.PathVariable('TOPDIR', 'Top directory', self.dir),
+
+            ('osname', 'OS name', 'windows' if self.windows else 'unix'),
+            ('osbits', 'OS bits', self.bits),
+            SCons.Script.BoolVariable('unix', 'operating system', self.unix),
+            SCons.Script.BoolVariable('linux', 'operating system', self.linux),
+            SCons.Script.BoolVariable('windows', 'operating system', self.windows),
+            SCons.Script.BoolVariable('macos', 'operating system', self.macos),
+            ('compiler', 'Choose compiler mode. This defines all flag system to use.', 'visual' if self.windows else 'gcc'),
+
+            ('EXTERNCPPPATH', 'Additional preprocessor paths (like CPPPATH but without dependencies check)', []),
+
+            # display options
+            ('SHCCCOMSTR', 'display option', '$SHCCCOM'),
+            ('SHCXXCOMSTR', 'display option', '$SHCXXCOM'),
+            ('SHLINKCOMSTR', 'display option', '$SHLINKCOM'),
+            ('CCCOMSTR', 'display option', '$CCCOM'),
+            ('CXXCOMSTR', 'display option', '$CXXCOM'),
+            ('LINKCOMSTR', 'display option', '$LINKCOM'),
+            ('ARCOMSTR', 'display option', '$ARCOM'),
+            ('INSTALLSTR', 'display option', 'Install file: $SOURCE as $TARGET'),
+            ('SWIG', 'swig binary', 'swig'),
+            ('SWIGCOMSTR', 'display option', '$SWIGCOM'),
+            ('QT_MOCFROMCXXCOMSTR', 'display option', '$QT_MOCFROMCXXCOM'),
+            ('QT_MOCFROMHCOMSTR', 'display option', '$QT_MOCFROMHCOM'),
+            ('QT_UICCOMSTR', 'display option', '$QT_UICCOM'),
+        )
+
+        colors = utils.colors.colors
+        opts.AddVariables( *[ ('color_'+c, 'color', colors[c] if c in self.defaultColors else '') for c in self.colorNames ] )
 
 
     def applyOptionsOnProject(self):
@@ -630,11 +795,10 @@ class SConsProject:
         if self.env['install']:
             install_dir = self.env['INSTALLPATH']
         self.dir_output        = install_dir
-        self.dir_output_bin    = os.path.join(install_dir, 'bin')
-        self.dir_output_lib    = os.path.join(install_dir, 'lib')
-        self.dir_output_plugin = os.path.join(install_dir, 'plugin')
-        self.dir_output_header = os.path.join(install_dir, 'include')
-        self.dir_output_test   = os.path.join(install_dir, 'test')
+        # all output directories are direct sub-directories of install_dir
+        install_prefix = install_dir.rstrip(os.sep) + os.sep
+        for name, subdir in self.outputSubDirs:
+            setattr(self, 'dir_output_'+name, install_prefix + subdir)
 
         # temporary files of SCons inside the build directory
         self.env['CONFIGUREDIR'] = os.path.join(self.dir_output_build, 'sconf_temp')
@@ -643,13 +807,65 @@ class SConsProject:
 
         if self.env['ccache']:
             if os.path.isabs(self.env['ccachedir']):
-                SCons.Script.CacheDir(self.env['ccachedir'])
+                compiler._cache.enableCache(self.env, self.env['ccachedir'])
             else:
-                SCons.Script.CacheDir(os.path.join(self.dir_output_build, self.env['ccachedir']))
+                compiler._cache.enableCache(self.env, os.path.join(self.dir_output_build, self.env['ccachedir']))
+        else:
+            # use the cache shared between projects, if defined in the user environment
+            compiler._cache.enableCache(self.env)
 
-        SCons.Script.SetOption('num_jobs', int(self.env['jobs']))
+        jobs = int(self.env['jobs'])
+        if not jobs:
+            jobs = max(int((os.cpu_count() or 1) * float(self.env['jobs_factor'])), 1)
+        SCons.Script.SetOption('num_jobs', jobs)
+        self.env.Decider(self.env['decider'])
+        SCons.Script.SetOption('max_drift', int(self.env['max_drift']))
+        SCons.Script.SetOption('implicit_cache', int(self.env['implicit_cache']))
 
         self.applyOptionsOnEnv(self.env)
+        self.checkIncludePathsChanged()
+
+    def checkIncludePathsChanged(self):
+        '''
+        The implicit dependencies cache (implicit_cache) misses the changes of the include paths.
+        So scan the implicit dependencies again if the global include paths or defines changed since the last build.
+        '''
+        import hashlib
+        def strValues(v):
+            return [str(i) for i in v] if SCons.Util.is_Sequence(v) else [str(v)]
+        values = [ strValues(self.env.get(k, [])) for k in ('CPPPATH', 'EXTERNCPPPATH', 'CPPDEFINES') ]
+        key = hashlib.blake2b(repr(values).encode()).hexdigest()
+        keyFile = os.path.join(self.dir_output_build, '.sconsign_cppkey')
+        try:
+            with open(keyFile) as f:
+                previousKey = f.read().strip()
+        except (IOError, OSError):
+            previousKey = None
+        if previousKey == key:
+            return
+        if previousKey is not None:
+            SCons.Script.SetOption('implicit_deps_changed', True)
+            # SCons only applies implicit_deps_changed before reading the SConstruct,
+            # but implicit_cache after: without the cache, all the implicit dependencies are scanned again
+            SCons.Script.SetOption('implicit_cache', False)
+        # the new key is only saved once the implicit dependencies are up to date
+        atexit.register(self.saveIncludePathsKey, keyFile, key)
+
+    def saveIncludePathsKey(self, keyFile, key):
+        '''
+        Save the key of the include paths and defines after a successful build. Called by atexit.
+        After a failed or interrupted build, the implicit dependencies are scanned again by the next build.
+        '''
+        import SCons.Script.Main
+        if SCons.Script.Main.exit_status != 0 or utils.utils.build_status()[0] != 'ok':
+            return
+        try:
+            if not os.path.isdir(os.path.dirname(keyFile)):
+                os.makedirs(os.path.dirname(keyFile))
+            with open(keyFile, 'w') as f:
+                f.write(key)
+        except (IOError, OSError):
+            pass
 
 
     def applyOptionsOnEnv(self, env):
@@ -663,8 +879,7 @@ class SConsProject:
         env.PrependENVPath('LIB', self.env['ENVLIBPATH'])
 
         if not env['colors']:
-            for c in ['color_clear', 'color_red', 'color_redB', 'color_green', 'color_blue', 'color_blueB', 'color_yellow', 'color_brown', 'color_violet', 'color_autoconf', 'color_header', 'color_title', 'color_compile', 'color_link', 'color_install', 'color_info', 'color_success', 'color_warning', 'color_fail', 'color_error']:
-                env[c] = ''
+            env.Replace( **self.noColors )
 
 
     def SConscript(self, dirs=[], exports=[]):
@@ -682,6 +897,11 @@ class SConsProject:
         '''
         The begining function the SConstruct need to call at first of all.
         '''
+        # nothing to configure to display the help
+        if SCons.Script.GetOption('help'):
+            print(HELP_TEXT)
+            SCons.Script.Exit(1)
+
         self.initOptions()
         self.applyOptionsOnProject()
 
@@ -690,40 +910,6 @@ class SConsProject:
             SCons.Script.Exit(1)
 
         SCons.Script.VariantDir(self.dir_output_build, self.dir, duplicate=0)
-        if SCons.Script.GetOption('help'):
-            print(
-            '''
-        -- Build targets --
-            scons                  : build all plugins and programs
-            scons plugins          : build all plugins
-            scons test             : build all tests ('unittest' for c++ tests, 'scripttest' for script tests)
-            scons doc              : build doxygen documentation
-
-        -- SCons options --
-            scons -H               : documentation of SCons itself
-            scons -Q               : making the SCons output less verbose
-            scons -j               : parallel builds
-            scons -i               : continue building after it encounters an error
-            scons --interactive    : to rebuild without reparsing SConscript files
-            scons --tree           : display all or part of the SCons dependency graph
-            scons --debug=presub   : pre-substitution string that SCons uses to generate the command lines it executes
-            scons --debug=findlibs : display what library names SCons is searching for, and in which directories it is searching
-
-        -- Configuration file --
-            If the external library installation is not directly in "/usr/include" and "/usr/lib",
-            you should indicate this information into a "host.sconf" file at the root of the project.
-            For example for jpeg:
-                incdir_jpeg = "/opt/custom/jpeg/include"
-                libdir_jpeg = "/opt/custom/jpeg/lib"
-            If the subdirectories use standard name: "include" and "lib", you could do the same thing with the shortcut:
-                dir_jpeg = "/opt/custom/jpeg"
-            
-            If it's needed you could also override the link libraries:
-                lib_jpeg = ["jpeg_custom", "mt"]
-        '''
-            )
-            SCons.Script.Exit(1)
-
         self.printInfos()
 
 
@@ -751,7 +937,7 @@ class SConsProject:
 
         if self.libs_error:
             sys.stdout.write(self.env['color_error'])
-            for lib in self.libs_error:
+            for lib in self.libs_error.values():
                 print("Error in '" + lib.name + "' library :")
                 if lib.error:
                     print('\t', lib.error)
@@ -791,46 +977,69 @@ class SConsProject:
     def createEnv(self, libs=[], name=''):
         '''
         Create an environment from the common one and apply libraries configuration to this environment.
+        The targets using the same libraries share the configuration of the first one: call invalidateEnvCache()
+        after a modification of the common environment (project.env) in a SConscript.
         @todo : add opts=[] ?
         '''
-        new_env = self.env.Clone()
         new_libs = list(libs)
         for lib in self.commonLibs:
             new_libs.insert(0, lib) # prepend (self.libs.sconsProject)
 
-        return self.appendLibsToEnv( new_env, new_libs, name )
+        # each target gets its own copy because it adds its local flags
+        key = tuple(id(lib) for lib in new_libs)
+        cached = self._envCache.get(key)
+        if cached:
+            libsDisabled, env = cached[1:]
+            for libName in libsDisabled:
+                print('Target "'+name+'" compiled without "'+libName+'" library.')
+            return env.Clone()
+        new_env = self.appendLibsToEnv( self.env.Clone(), new_libs, name )
+        # the messages of the disabled libraries are displayed again for the next targets
+        libsDisabled = ()
+        if self.needConfigure():
+            libsDisabled = tuple( lib.name for lib, level in autoconf._toposort.toposort(new_libs)
+                                  if not lib.alwaysEnabled and not lib.enabled(new_env) )
+        # the libraries are kept in the cache, so their ids can't be reused
+        self._envCache[key] = (tuple(new_libs), libsDisabled, new_env.Clone())
+        return new_env
+
+    def invalidateEnvCache(self):
+        '''
+        The next targets will be configured again from the common environment (project.env).
+        To call after a modification of project.env, once some targets have been created.
+        '''
+        self._envCache.clear()
 
     def appendLibsToEnv(self, env, libs=[], name=''):
         '''
         Append libraries to an environment.
+        The libraries already appended to env are not configured again.
         '''
+        envLibs = env.get('SconsProjectLibraries')
+        if envLibs:
+            existing = set(id(lib) for lib in envLibs)
+            libs = [lib for lib in libs if id(lib) not in existing]
         if not libs:
             return env
 
         sys.stdout.write(self.env['color_autoconf']) # print without new line
 
-        if 'SconsProjectLibraries' in env:
-            env['SconsProjectLibraries'] += libs
-        else:
-            env['SconsProjectLibraries'] = libs
+        # a new list, to not modify the list of the caller or of a cloned environment
+        env['SconsProjectLibraries'] = envLibs + libs if envLibs else list(libs)
 
         opts_current = self.opts
 
-        allLibs = []
-        for eachlib in libs:
-            libdeps = self.findLibsDependencies(eachlib)
-            allLibs.extend( libdeps )
-            allLibs.append( (eachlib,0) )
-        allLibs = self.uniqLibs(allLibs)
+        # all libraries sorted with dependencies first,
+        # the requested libraries and their direct dependencies are at level 0
+        allLibs = [ (lib, max(level-1, 0)) for lib, level in autoconf._toposort.toposort(libs) ]
 
         #print 'libs:', [a.name for a in libs]
         #print 'allLibs:', [a.name for a in allLibs]
         #print '-'*10
 
         for lib, level in allLibs:
-            if not lib.initOptions(self, opts_current):
-                if lib not in self.libs_error:
-                    self.libs_error.append(lib)
+            if lib.hasOptions and not lib.initOptions(self, opts_current):
+                self.libs_error.setdefault(id(lib), lib)
         opts_current.Update(env)
         self.applyOptionsOnEnv(env)
 
@@ -838,9 +1047,14 @@ class SConsProject:
             lib.initEnv(self, env)
 
         if self.needConfigure():
+            # compile the configure tests of the libraries in parallel outside of SCons,
+            # so the sequential checks below only read the probe cache
+            jobs = SCons.Script.GetOption('num_jobs')
+            if self.env['parallel_probe'] and jobs > 1:
+                self.preProbe( [lib for lib, level in allLibs if lib.alwaysEnabled or lib.enabled(env)], jobs )
             libs_error = []
             for lib, level in allLibs:
-                if not lib.enabled(env):
+                if not lib.alwaysEnabled and not lib.enabled(env):
                     print('Target "'+name+'" compiled without "'+lib.name+'" library.')
                 else:
                     checkStatus = True
@@ -850,6 +1064,8 @@ class SConsProject:
                     if not lib.configure(self, env):
                         checkStatus = False
                     else:
+                        # the checks need the flags of the libraries already configured
+                        self.applyPendingEnv(env)
                         conf = env.Configure()
                         if not lib.check(self, conf):
                             checkStatus = False
@@ -860,17 +1076,17 @@ class SConsProject:
             #print '-- name:', name
             #print '-- libs_error:', libs_error
             #print '-- allLibs:', [a[0].name for a in allLibs]
-            if 'SconsProject_missingDependencies' not in env:
-                env['SconsProject_missingDependencies'] = []
-            env['SconsProject_missingDependencies'].extend([l.name for l in libs_error])
+            env.setdefault('SconsProject_missingDependencies', []).extend(l.name for l in libs_error)
             #print '-- SconsProject_missingDependencies:', env['SconsProject_missingDependencies']
 
             for lib in libs_error:
-                if lib not in self.libs_error:
-                    self.libs_error.append(lib)
+                self.libs_error.setdefault(id(lib), lib)
+
+        self.applyPendingEnv(env)
 
         for lib, level in allLibs:
             lib.postconfigure(self, env, level)
+        self.applyPendingEnv(env)
 
         sys.stdout.write(self.env['color_clear'])
 
@@ -898,24 +1114,77 @@ class SConsProject:
 
         if not self.needCheck():
             lib.checkDone = True
-            self.allLibsChecked.append( lib.name )
+            self.allLibsChecked.add( lib.name )
             return True
 
         dependencies = self.uniqLibs( self.findLibsDependencies(lib) )
 
-        checkStatus = True
         #print "_"*50
         #print "lib.name:", lib.name
         #print "dependencies:", [d.name for d in dependencies]
 
+        if id(lib) in self._checkEnvs:
+            check_env, checkStatus = self._checkEnvs.pop(id(lib))
+        else:
+            check_env, checkStatus = self.createCheckEnv( lib, dependencies )
+        check_conf = check_env.Configure()
+        for a, level in dependencies:
+            a.check(self, check_conf)
+        if not lib.check(self, check_conf):
+            checkStatus = False
+        check_env = check_conf.Finish()
+
+        lib.checkDone = True
+        self.allLibsChecked.add( lib.name )
+
+        return checkStatus
+
+    def pendingAppend(self, env, **kw):
+        '''
+        Register values to append to env at the end of the current configure pass.
+        '''
+        pending = self._pendingAppend[id(env)]
+        for k, v in kw.items():
+            pending[k].extend( v if isinstance(v, (list, tuple)) else [v] )
+
+    def pendingPrepend(self, env, **kw):
+        '''
+        Register values to prepend to env at the end of the current configure pass.
+        The last registered values will be the first ones in the environment.
+        '''
+        pending = self._pendingPrepend[id(env)]
+        for k, v in kw.items():
+            pending[k].append( v if isinstance(v, (list, tuple)) else [v] )
+
+    def applyPendingEnv(self, env):
+        '''
+        Apply the values registered by the libraries to env, with a single update per variable.
+        '''
+        def uniqueValues(values):
+            try:
+                return list(dict.fromkeys(values))
+            except TypeError: # unhashable values
+                return values
+        pendingAppend = self._pendingAppend.pop(id(env), None)
+        if pendingAppend:
+            env.AppendUnique( **dict((k, uniqueValues(v)) for k, v in pendingAppend.items()) )
+        pendingPrepend = self._pendingPrepend.pop(id(env), None)
+        if pendingPrepend:
+            env.PrependUnique( **dict((k, uniqueValues([i for values in reversed(v) for i in values])) for k, v in pendingPrepend.items()) )
+
+    def createCheckEnv( self, lib, dependencies ):
+        '''
+        Create a temporary environment configured with lib and its dependencies, to check lib.
+        Returns the environment and the configure status of lib.
+        '''
         check_env = self.env.Clone()
 
         check_opts = self.opts
         for a, level in dependencies:
-            a.initOptions(self, check_opts)
-        if not lib.initOptions(self, check_opts):
-            if lib not in self.libs_error:
-                self.libs_error.append(lib)
+            if a.hasOptions:
+                a.initOptions(self, check_opts)
+        if lib.hasOptions and not lib.initOptions(self, check_opts):
+            self.libs_error.setdefault(id(lib), lib)
         check_opts.Update(check_env)
         self.applyOptionsOnEnv(check_env)
 
@@ -924,29 +1193,52 @@ class SConsProject:
         lib.initEnv(self, check_env)
         for a, level in dependencies:
             a.configure(self, check_env)
-        if not lib.configure(self, check_env):
-            checkStatus = False
-        check_conf = check_env.Configure()
-        for a, level in dependencies:
-            a.check(self, check_conf)
-        if not lib.check(self, check_conf):
-            checkStatus = False
-        check_env = check_conf.Finish()
+        configureStatus = lib.configure(self, check_env)
+        self.applyPendingEnv(check_env)
+        return check_env, configureStatus
 
-        lib.checkDone = True
-        self.allLibsChecked.append( lib.name )
-
-        return checkStatus
+    def preProbe( self, libs, jobs=None ):
+        '''
+        Optional step, enabled by the parallel_probe option or called in the SConstruct before the SConscripts.
+        The checks of the libraries are run a first time against a context answering True to the recorded tests,
+        so they should not have side effects. A library using another test is not pre-probed.
+        Compile the configure tests of libs and all their dependencies in parallel, outside of SCons.
+        The successful tests are stored in the probe cache, so the sequential checks done by SCons
+        become cache hits. The failed tests are checked again by SCons to report the errors.
+        The check environments are kept for checkLibrary, so they are only created once.
+        '''
+        if not self.needConfigure() or not self.needCheck():
+            return
+        if self.compiler.name not in autoconf._parallel_probe.gccLikeCompilers:
+            return # the commands are only written for gcc-like compilers
+        probes = []
+        for lib, level in autoconf._toposort.toposort( self.asList(libs) ):
+            if lib.sconsNode or lib.checkDone or lib.name in self.allLibsChecked:
+                continue
+            dependencies = self.uniqLibs( self.findLibsDependencies(lib) )
+            check_env, configureStatus = self.createCheckEnv( lib, dependencies )
+            # the recording modifies the environment like successful tests, checkLibrary uses a copy
+            self._checkEnvs[id(lib)] = (check_env.Clone(), configureStatus)
+            recorder = autoconf._parallel_probe.RecordingConf( check_env )
+            try:
+                for a, level in dependencies:
+                    a.check(self, recorder)
+                lib.check(self, recorder)
+            except autoconf._parallel_probe.UnrecordedTest:
+                continue # the result of the other test is unknown, the recorded tests may be wrong
+            probes.extend( recorder.probes )
+        autoconf._parallel_probe.probeAll( probes, jobs )
 
     def uniqLibs(self, allLibs):
         '''
         Return the list of libraries contains in allLibs without any duplication.
         '''
         libs = []
-        names = []
+        names = set()
         for s, level in allLibs:
-            if (s.name, s.id) not in names:
-                names.append( (s.name, s.id) )
+            key = (s.name, s.id)
+            if key not in names:
+                names.add( key )
                 libs.append( (s,level) )
         return libs
 
@@ -954,22 +1246,19 @@ class SConsProject:
         '''
         return the list of all dependencies of lib (without the lib itself).
         '''
-        def internFindLibDependencies(lib, level=0):
-            if not lib:
-                return []
-            ll = []
-            for l in lib.dependencies:
-                ll.extend( internFindLibDependencies(l, level+1) )
-            ll.append( (lib,level) )
-            return ll
-
         if not isinstance(libs, list):
-            libs = [libs]
-        ll = []
-        for lib in libs:
-            for l in lib.dependencies:
-                ll.extend( internFindLibDependencies(l) )
-        return ll
+            return libs.flatDependencies()
+        # same list of libraries (with the same direct dependencies) than a previous call
+        key = tuple(id(lib) for lib in libs)
+        directDependencies = [dep for lib in libs for dep in lib.dependencies]
+        depsKey = tuple(id(dep) for dep in directDependencies)
+        cached = self._depsCache.get(key)
+        if cached and cached[1] == depsKey:
+            return cached[2]
+        allDependencies = autoconf._toposort.toposort(directDependencies)
+        # the libraries are kept in the cache, so their ids can't be reused
+        self._depsCache[key] = (tuple(libs), depsKey, allDependencies)
+        return allDependencies
 
 # todo
 #    def Install(self):
@@ -983,14 +1272,51 @@ class SConsProject:
         If elements are not a list type, put it into a list to merge the values.
         '''
         for k, v in src.items():
-            if k in dst:
-                vlist = (v if isinstance(v, list) else [v])
-                if isinstance(dst[k], list):
-                    dst[k].extend( vlist )
+            d = dst.get(k, dst)
+            if d is dst: # not in dst
+                dst[k] = v
+            elif isinstance(d, list):
+                if isinstance(v, list):
+                    d.extend( v )
                 else:
-                    dst[k] = [dst[k]] + vlist
+                    d.append( v )
             else:
-                dst[k] = v
+                dst[k] = [d] + (v if isinstance(v, list) else [v])
+
+    def applyTargetFlags(self, env, includes, localEnvFlags, replaceLocalEnvFlags, globalEnvFlags):
+        '''
+        Apply the include directories and the flags arguments of a target to its environment.
+        Same result as an AppendUnique of each one, in this order, with replaceLocalEnvFlags
+        applied before globalEnvFlags, but with a single AppendUnique if nothing is replaced.
+        '''
+        def toList(v):
+            # tuples are kept as single values (eg. a CPPDEFINES with a value)
+            return list(v) if SCons.Util.is_List(v) else [v]
+        def merge(flags, more):
+            for k, v in more.items():
+                # a new list for the variables in both, the arguments are not modified
+                flags[k] = toList(flags[k]) + toList(v) if k in flags else v
+        appendFlags = { 'CPPPATH': includes }
+        merge( appendFlags, localEnvFlags )
+        if replaceLocalEnvFlags:
+            env.AppendUnique( **appendFlags )
+            env.Replace( **replaceLocalEnvFlags )
+            appendFlags = {}
+        merge( appendFlags, globalEnvFlags )
+        if appendFlags:
+            env.AppendUnique( **appendFlags )
+
+    def applyPrecompiledHeader(self, env, precinc, precsrc):
+        '''
+        Use the precompiled header "precinc" (created from "precsrc") in env.
+        Only supported with visual on windows.
+        '''
+        if not (precinc and self.windows):
+            return
+        header = self.getRealAbsoluteCwd() + '/' + precinc
+        env['PCHSTOP'] = header
+        env.Append( CPPFLAGS = [ '/FI' + header, '/Zm135' ] )
+        env['PCH'] = env.PCH( precsrc )[0]
 
     def prepareIncludes(self, dirs):
         objDirs = [SCons.Script.Dir(d) for d in self.getAllAbsoluteCwd(dirs)]
@@ -1002,6 +1328,11 @@ class SConsProject:
             resources=[], misc=[],
             env=None
             ):
+        '''
+        Create a visual studio project for buildTarget.
+        Nothing is done (not even a copy of the environment) if we are not on windows,
+        so callers don't have to prepare the sources and headers lists on other platforms.
+        '''
         if not self.windows:
             return
 
@@ -1028,13 +1359,25 @@ class SConsProject:
 
         # add EXTERNCPPPATH to the standard CPPPATH, to add those include paths to the visualProject
         l_env.AppendUnique( CPPPATH = l_env['EXTERNCPPPATH'] )
-        l_env.Replace( CPPPATH = self.convertSconsPathToStr(l_env['CPPPATH']) )
+        # sibling targets have the same include paths, convert them only once
+        cpppath = tuple(SCons.Util.flatten(l_env['CPPPATH']))
+        key = tuple(id(p) for p in cpppath)
+        cached = self._cpppathStrCache.get(key)
+        if cached is None:
+            # the paths are kept in the cache, so their ids can't be reused
+            cached = self._cpppathStrCache.setdefault(key, (cpppath, self.convertSconsPathToStr(list(cpppath))))
+        l_env.Replace( CPPPATH = list(cached[1]) )
+
+        # same as getRealAbsoluteCwd, with a single lookup of the current directory for all the files
+        cdir = self.getRealAbsoluteCwd()
+        def toProjectPaths(files):
+            return [ os.path.normpath( _realAbsolutePath(self.dir, self.dir_output_build, cdir, i) ) for i in files ]
 
         visualProject = l_env.MSVSProject(
-            target = os.path.normpath( self.getRealAbsoluteCwd(visualProjectFile) ),
-            srcs = [ os.path.normpath( self.getRealAbsoluteCwd(i) ) for i in sources],
-            incs = [ os.path.normpath( self.getRealAbsoluteCwd(i) ) for i in headers],
-            localincs = [ os.path.normpath( self.getRealAbsoluteCwd(i) ) for i in localHeaders],
+            target = toProjectPaths([visualProjectFile])[0],
+            srcs = toProjectPaths(sources),
+            incs = toProjectPaths(headers),
+            localincs = toProjectPaths(localHeaders),
             resources = resources,
             misc = misc,
             buildtarget = buildTarget[0],
@@ -1061,10 +1404,7 @@ class SConsProject:
 
         # add the new declared library to the list of libs checker in self.libs
         if public:
-            if publicName:
-                setattr(self.libs, publicName, dstLibChecker)
-            else:
-                setattr(self.libs, target, dstLibChecker)
+            setattr(self.libs, publicName or target, dstLibChecker)
 
         self.allTargets[publicName if publicName else target] = (None,dstLibChecker)
         return dstLibChecker
@@ -1118,8 +1458,10 @@ class SConsProject:
         l_includes = self.asList(includes)
         sourcesFiles = []
         sourcesFiles += l_sources
+        scannedHeaders = []
         if l_dirs:
-            sourcesFiles += self.scanFiles( l_dirs, accept, reject, inBuildDir=True )
+            scannedSources, scannedHeaders = self.scanSourcesAndHeaders( l_dirs, accept, reject )
+            sourcesFiles += scannedSources
 
         if not sourcesFiles:
             raise RuntimeError( "No source files for the target: " + target )
@@ -1134,21 +1476,14 @@ class SConsProject:
 
         # apply arguments to env
         localIncludes = self.prepareIncludes(l_includes)
-        localEnv.AppendUnique( CPPPATH = localIncludes )
-        if localEnvFlags:
-            localEnv.AppendUnique( **localEnvFlags )
-        if replaceLocalEnvFlags:
-            localEnv.Replace( **replaceLocalEnvFlags )
-        if globalEnvFlags:
-            localEnv.AppendUnique( **globalEnvFlags )
+        self.applyTargetFlags( localEnv, localIncludes, localEnvFlags, replaceLocalEnvFlags, globalEnvFlags )
 
         if shared:
-            localEnv.AppendUnique( CCFLAGS = self.CC['sharedobject'] )
+            # all the flags of shared objects in a single update
+            sharedCcflags = self.unique( SCons.Util.flatten([self.CC['sharedobject'], localEnv.get('SHCCFLAGS', [])]) )
+            sharedLinkflags = self.unique( SCons.Util.flatten(localEnv.get('SHLINKFLAGS', [])) )
+            localEnv.AppendUnique( CCFLAGS = sharedCcflags, LINKFLAGS = sharedLinkflags )
             localEnv['OBJSUFFIX'] = '.os'
-            if 'SHCCFLAGS' in localEnv:
-                localEnv.AppendUnique( CCFLAGS = localEnv['SHCCFLAGS'] )
-            if 'SHLINKFLAGS' in localEnv:
-                localEnv.AppendUnique( LINKFLAGS = localEnv['SHLINKFLAGS'] )
 
         if 'ADDSRC' in localEnv:
             sourcesFiles = sourcesFiles + localEnv['ADDSRC']
@@ -1156,10 +1491,7 @@ class SConsProject:
         sourcesFiles = self.getAbsoluteCwd( sourcesFiles )
 
         #adding precompiled headers
-        if precinc and self.windows:
-            localEnv['PCHSTOP'] = self.getRealAbsoluteCwd() + '/' + precinc
-            localEnv.Append( CPPFLAGS = [ '/FI' + self.getRealAbsoluteCwd() + '/' + precinc, '/Zm135' ] )
-            localEnv['PCH'] = localEnv.PCH( precsrc )[0]
+        self.applyPrecompiledHeader( localEnv, precinc, precsrc )
 
         # create the target
         dstLib = localEnv.StaticLibrary( target=target, source=sourcesFiles )
@@ -1183,7 +1515,7 @@ class SConsProject:
         self.declareTarget(localEnv, target)
 
         if self.windows:
-            l_headers = self.scanFiles( l_dirs, accept=['*.h', '*.hpp', '*.tcc', '*.inl', '*.H'] ) + headers
+            l_headers = scannedHeaders + headers
             self.MSVSProject( target, dstLibInstall,
                 sources=sourcesFiles,
                 headers=l_headers, localHeaders=localHeaders,
@@ -1191,16 +1523,13 @@ class SConsProject:
                 )
 
         # expose this library
-        envFlags=externEnvFlags
+        envFlags=dict(externEnvFlags) # don't modify the argument (or its default value)
         self.appendDict( envFlags, globalEnvFlags )
         dstLibChecker = autoconf._internal.InternalLibChecker( lib=target, includes=self.prepareIncludes(l_includes), envFlags=envFlags, dependencies=libraries+dependencies, sconsNode=dstLibInstall )
 
         # add the new declared library to the list of libs checker in self.libs
         if public:
-            if publicName:
-                setattr(self.libs, publicName, dstLibChecker)
-            else:
-                setattr(self.libs, target, dstLibChecker)
+            setattr(self.libs, publicName or target, dstLibChecker)
 
         self.allTargets[publicName if publicName else target] = (dstLibInstall,dstLibChecker)
         return dstLibInstall
@@ -1243,8 +1572,10 @@ class SConsProject:
         l_includes = self.asList(includes)
         sourcesFiles = []
         sourcesFiles += l_sources
+        scannedHeaders = []
         if l_dirs:
-            sourcesFiles += self.scanFiles( l_dirs, accept, reject, inBuildDir=True )
+            scannedSources, scannedHeaders = self.scanSourcesAndHeaders( l_dirs, accept, reject )
+            sourcesFiles += scannedSources
 
         if not sourcesFiles:
             raise RuntimeError( "No source files for the target: " + target )
@@ -1254,21 +1585,14 @@ class SConsProject:
         if env:
             localEnv = env.Clone()
             self.appendLibsToEnv(localEnv, localLibraries)
-            if 'SconsProjectLibraries' in localEnv:
-                localLibraries += localEnv['SconsProjectLibraries']
+            localLibraries += localEnv.get('SconsProjectLibraries', [])
         else:
             # if no environment we create a new one
             localEnv = self.createEnv( localLibraries, name=target )
 
         # apply arguments to env
         localIncludes = self.prepareIncludes(l_includes)
-        localEnv.AppendUnique( CPPPATH = localIncludes )
-        if localEnvFlags:
-            localEnv.AppendUnique( **localEnvFlags )
-        if replaceLocalEnvFlags:
-            localEnv.Replace( **replaceLocalEnvFlags )
-        if globalEnvFlags:
-            localEnv.AppendUnique( **globalEnvFlags )
+        self.applyTargetFlags( localEnv, localIncludes, localEnvFlags, replaceLocalEnvFlags, globalEnvFlags )
 
         if 'ADDSRC' in localEnv:
             sourcesFiles = sourcesFiles + localEnv['ADDSRC']
@@ -1276,10 +1600,7 @@ class SConsProject:
         sourcesFiles = self.getAbsoluteCwd( sourcesFiles )
 
         #adding precompiled headers
-        if precinc and self.windows:
-            localEnv['PCHSTOP'] = self.getRealAbsoluteCwd() + '/' + precinc
-            localEnv.Append( CPPFLAGS = [ '/FI' + self.getRealAbsoluteCwd() + '/' + precinc, '/Zm135' ] )
-            localEnv['PCH'] = localEnv.PCH( precsrc )[0]
+        self.applyPrecompiledHeader( localEnv, precinc, precsrc )
 
         #print "target:", target
         localEnv['PDB'] = str(target) + '.pdb'
@@ -1308,7 +1629,7 @@ class SConsProject:
         self.declareTarget(localEnv, target)
 
         if self.windows:
-            l_headers = self.scanFiles( l_dirs, accept=['*.h', '*.hpp', '*.tcc', '*.inl', '*.H'] ) + headers
+            l_headers = scannedHeaders + headers
             self.MSVSProject( target, dstLibInstall,
                 sources = sourcesFiles,
                 headers = l_headers, localHeaders=localHeaders,
@@ -1316,16 +1637,13 @@ class SConsProject:
                 )
 
         # expose this library
-        envFlags=externEnvFlags
+        envFlags=dict(externEnvFlags) # don't modify the argument (or its default value)
         self.appendDict( envFlags, globalEnvFlags )
         dstLibChecker = autoconf._internal.InternalLibChecker( lib=target, includes=self.prepareIncludes(l_includes), envFlags=envFlags, dependencies=localLibraries+dependencies, sconsNode=dstLibInstall )
 
         # add the new declared library to the list of libs checker in self.libs
         if public:
-            if publicName:
-                setattr(self.libs, publicName, dstLibChecker)
-            else:
-                setattr(self.libs, target, dstLibChecker)
+            setattr(self.libs, publicName or target, dstLibChecker)
 
         if publicName:
             localEnv.Alias( publicName, dstLibInstall )
@@ -1368,10 +1686,11 @@ class SConsProject:
         l_dirs = self.asList(dirs)
         l_libraries = self.asList(libraries)
         l_includes = self.asList(includes)
-        sourcesFiles = []
-        sourcesFiles += l_sources
+        sourcesFiles = l_sources # already a new list
+        scannedHeaders = []
         if l_dirs:
-            sourcesFiles += self.scanFiles( l_dirs, accept, reject, inBuildDir=True )
+            scannedSources, scannedHeaders = self.scanSourcesAndHeaders( l_dirs, accept, reject )
+            sourcesFiles += scannedSources
 
         if not sourcesFiles:
             raise RuntimeError( "No source files for the target: " + target )
@@ -1381,21 +1700,14 @@ class SConsProject:
         if env:
             localEnv = env.Clone()
             self.appendLibsToEnv(localEnv, localLibraries)
-            if 'SconsProjectLibraries' in localEnv:
-                localLibraries += localEnv['SconsProjectLibraries']
+            localLibraries += localEnv.get('SconsProjectLibraries', [])
         else:
             # if no environment we create a new one
             localEnv = self.createEnv( localLibraries, name=target )
 
         # apply arguments to env
         localIncludes = self.prepareIncludes(l_includes)
-        localEnv.AppendUnique( CPPPATH = localIncludes )
-        if localEnvFlags:
-            localEnv.AppendUnique( **localEnvFlags )
-        if replaceLocalEnvFlags:
-            localEnv.Replace( **replaceLocalEnvFlags )
-        if globalEnvFlags:
-            localEnv.AppendUnique( **globalEnvFlags )
+        self.applyTargetFlags( localEnv, localIncludes, localEnvFlags, replaceLocalEnvFlags, globalEnvFlags )
 
         sourcesFiles = self.getAbsoluteCwd( sourcesFiles )
 
@@ -1405,10 +1717,7 @@ class SConsProject:
                 print(rc)
             #   sourcesFiles.append( localEnv.RES( rc ) );
 
-        if precinc and self.windows:
-            localEnv['PCHSTOP'] = self.getRealAbsoluteCwd() + '/' + precinc
-            localEnv.Append( CPPFLAGS = [ '/FI' + self.getRealAbsoluteCwd() + '/' + precinc, '/Zm135' ] )
-            localEnv['PCH'] = localEnv.PCH( precsrc )[0]
+        self.applyPrecompiledHeader( localEnv, precinc, precsrc )
 
         # create the target
         dst = localEnv.Program( target=target, source=sourcesFiles )
@@ -1417,7 +1726,7 @@ class SConsProject:
         self.declareTarget(localEnv, target)
 
         if self.windows:
-            l_headers = self.scanFiles( l_dirs, accept=['*.h', '*.hpp', '*.tcc', '*.inl', '*.H'] ) + headers
+            l_headers = scannedHeaders + headers
             self.MSVSProject( target, dstInstall,
                 sources=sourcesFiles,
                 headers=l_headers, localHeaders=localHeaders,
@@ -1428,6 +1737,28 @@ class SConsProject:
         return dstInstall
 
 
+    def initSwigEnv(self, bindingEnv, language, outputDir):
+        '''
+        Swig configuration common to all the bindings.
+        "language" is used in the names of the generated files, "outputDir" receives the generated modules.
+        '''
+        bindingEnv.AppendUnique( SWIGPATH = bindingEnv['CPPPATH'], # todo: it's specific to the sourceLanguage
+                                 SWIGOUTDIR = outputDir )
+        bindingEnv.Replace( SWIGCFILESUFFIX = '_wrap_' + language + '$CFILESUFFIX',
+                            SWIGCXXFILESUFFIX = '_wrap_' + language + '$CXXFILESUFFIX',
+                            SWIGDIRECTORSUFFIX = '_wrap_' + language + '.h' )
+
+    def applySwigBuildOptions(self, bindingEnv):
+        '''
+        Options of the compilation of the swig bindings.
+        The sources are the ".i" files, so the flags only apply to the generated wrappers.
+        '''
+        if bindingEnv['fast_swig_build']:
+            # the generated wrappers are huge and slow to optimize
+            bindingEnv.Append( CCFLAGS = self.CC['nooptimize'] )
+        # swig, javac and jar are long commands, don't overload the machine when called from "make -j"
+        utils.jobserver.useJobserver( bindingEnv )
+
     def pySwigBinding( self,
             packageName,
             moduleName,
@@ -1459,17 +1790,15 @@ class SConsProject:
         swigPython3Flag = ['-py3'] if pythonMajorVersion == 3 else []
 
         bindingEnv.AppendUnique( SWIGFLAGS = ['-python','-'+sourceLanguage] + defaultSwigFlags + swigFlags + swigPython3Flag )
-        bindingEnv.AppendUnique( SWIGPATH = bindingEnv['CPPPATH'] ) # todo: it's specific to the sourceLanguage
-        bindingEnv.AppendUnique( SWIGOUTDIR = packageOutputDir )
-        bindingEnv.Replace( SWIGCFILESUFFIX = "_wrap_python$CFILESUFFIX" )
-        bindingEnv.Replace( SWIGCXXFILESUFFIX = "_wrap_python$CXXFILESUFFIX" )
-        bindingEnv.Replace( SWIGDIRECTORSUFFIX = "_wrap_python.h" )
+        self.initSwigEnv( bindingEnv, 'python', packageOutputDir )
         bindingEnv.Replace( SHLIBPREFIX = '' )
         if self.macos:
             bindingEnv.Replace( SHLIBSUFFIX = '.so' ) # .dyLib not recognized
         if self.windows:
              bindingEnv.Replace( SHLIBSUFFIX = '.pyd' ) # .dll not recognized
 
+        self.applySwigBuildOptions( bindingEnv )
+
         pyBindingModule = self.SharedLibrary(
                 target = 'python_' + moduleName,
                 sources = sources,
@@ -1482,6 +1811,8 @@ class SConsProject:
                                     [ SCons.Script.Mkdir('${TARGET.dir}'),
                                       SCons.Script.Touch('$TARGET'),
                                     ])
+        # an empty file created by a Touch, not worth a copy from the cache
+        compiler._cache.noCache( bindingEnv, initFile )
         bindingEnv.Requires( pyBindingModule, initFile )
 
         bindingEnv.Alias( 'python', pyBindingModule )
@@ -1519,14 +1850,12 @@ class SConsProject:
             ] + libraries, name=packageName )
 
         bindingEnv.AppendUnique( SWIGFLAGS = ['-java', '-'+sourceLanguage, '-package', packageName] + defaultSwigFlags + swigFlags )
-        bindingEnv.AppendUnique( SWIGPATH = bindingEnv['CPPPATH'] ) # todo: it's specific to the sourceLanguage
-        bindingEnv.AppendUnique( SWIGOUTDIR = packageOutputDir )
-        bindingEnv.Replace( SWIGCFILESUFFIX = "_wrap_java$CFILESUFFIX" )
-        bindingEnv.Replace( SWIGCXXFILESUFFIX = "_wrap_java$CXXFILESUFFIX" )
-        bindingEnv.Replace( SWIGDIRECTORSUFFIX = "_wrap_java.h" )
+        self.initSwigEnv( bindingEnv, 'java', packageOutputDir )
         #bindingEnv.Replace(  )
         # bindingEnv.Replace( SHLIBPREFIX = '' )
 
+        self.applySwigBuildOptions( bindingEnv )
+
         javaBindingModule = self.SharedLibrary(
                 target = 'java_' + moduleName,
                 sources = sources,
@@ -1579,14 +1908,12 @@ class SConsProject:
             ] + libraries, name=packageName )
 
         bindingEnv.AppendUnique( SWIGFLAGS = ['-matlab','-'+sourceLanguage] + defaultSwigFlags + swigFlags )
-        bindingEnv.AppendUnique( SWIGPATH = bindingEnv['CPPPATH'] ) # todo: it's specific to the sourceLanguage
-        bindingEnv.AppendUnique( SWIGOUTDIR = packageOutputDir )
-        bindingEnv.Replace( SWIGCFILESUFFIX = "_wrap_matlab$CFILESUFFIX" )
-        bindingEnv.Replace( SWIGCXXFILESUFFIX = "_wrap_matlab$CXXFILESUFFIX" )
-        bindingEnv.Replace( SWIGDIRECTORSUFFIX = "_wrap_matlab.h" )
+        self.initSwigEnv( bindingEnv, 'matlab', packageOutputDir )
         bindingEnv.Replace( SHLIBPREFIX = '' )
         bindingEnv.Replace( SHLIBSUFFIX = '.mexa64' )
 
+        self.applySwigBuildOptions( bindingEnv )
+
         bindingModule = self.SharedLibrary(
                 target = 'matlab_' + moduleName,
                 sources = sources,
@@ -1598,6 +1925,8 @@ class SConsProject:
         moduleDir = bindingEnv.Command( os.path.join(packageOutputDir, "+" + moduleName), '',
                                     [ SCons.Script.Mkdir('${TARGET}'),
                                     ])
+        # a directory can't be retrieved from the cache
+        compiler._cache.noCache( bindingEnv, moduleDir )
         bindingEnv.Requires( bindingModule, moduleDir )
 
         self.declareTarget(bindingEnv, bindingModule, packageName)
@@ -1633,8 +1962,7 @@ class SConsProject:
         if env:
             localEnv = env.Clone()
             self.appendLibsToEnv(localEnv, localLibraries)
-            if 'SconsProjectLibraries' in localEnv:
-                localLibraries += localEnv['SconsProjectLibraries']
+            localLibraries += localEnv.get('SconsProjectLibraries', [])
         else:
             # if no environment we create a new one
             localEnv = self.createEnv( localLibraries, name='-'.join(l_target) )
@@ -1643,13 +1971,7 @@ class SConsProject:
         self.appendLibsToEnv(localExecEnv, l_execLibraries)
 
         # apply arguments to env
-        localEnv.AppendUnique( CPPPATH = self.prepareIncludes(l_includes) )
-        if localEnvFlags:
-            localEnv.AppendUnique( **localEnvFlags )
-        if replaceLocalEnvFlags:
-            localEnv.Replace( **replaceLocalEnvFlags )
-        if globalEnvFlags:
-            localEnv.AppendUnique( **globalEnvFlags )
+        self.applyTargetFlags( localEnv, self.prepareIncludes(l_includes), localEnvFlags, replaceLocalEnvFlags, globalEnvFlags )
 
         # create the target
         dst = localEnv.UnitTest( target=l_target, source=l_sources, execEnv=localExecEnv )
@@ -1697,7 +2019,7 @@ class SConsProject:
             depsFromFile = []
             if checkDependencies:
                 scriptFilename = self.getRealAbsoluteCwd(s)
-                firstline = file(scriptFilename, 'r').readline()
+                firstline = readFirstLine(scriptFilename)
                 sconsDepPattern = '# scons:'
                 if firstline.startswith(sconsDepPattern):
                     dependenciesStr = firstline[len(sconsDepPattern):].split()
@@ -1707,15 +2029,16 @@ class SConsProject:
                     else:
                         err = []
                         for d in dependenciesStr:
-                            if d not in self.allTargets:
+                            t = self.allTargets.get(d)
+                            if t is None:
                                 err.append(d)
+                            else:
+                                targets.append(t)
                         if err:
                             if self.env['mode'] == 'production':
                                 continue
-                            allDeps = self.allTargets.keys()
-                            allDeps.sort()
+                            allDeps = sorted(self.allTargets)
                             raise ValueError( ('''Some dependencies of the scripttest "%s" doesn't exist.\nMissing deps:\n    %s\nExisting dependencies are:\n    %s\n''') % (scriptFilename, str(err), str(allDeps)) )
-                        targets = [self.allTargets[d] for d in dependenciesStr]
                     depsFromFile = [d[0] for d in targets if d[0]]
                     libsFromFile = [d[1] for d in targets if d[1]]
 
@@ -1723,8 +2046,7 @@ class SConsProject:
             localLibraries = l_libraries + libsFromFile
             if env:
                 localEnv = env.Clone()
-                if 'SconsProjectLibraries' in localEnv:
-                    localLibraries += localEnv['SconsProjectLibraries']
+                localLibraries += localEnv.get('SconsProjectLibraries', [])
                 self.appendLibsToEnv(localEnv, localLibraries)
             else:
                 # if no environment we create a new one
@@ -1749,74 +2071,141 @@ class SConsProject:
 #-------------------- Automatic file/directory search -------------------------#
     def asList(self, v):
         '''Return v inside a list if not a list.'''
-        if isinstance(v, list):
-            return v[:]
-        if isinstance(v, tuple):
-            return v[:]
+        # always a new list: the callers extend the result
+        if isinstance(v, (list, tuple)):
+            return list(v)
         if isinstance(v, SCons.Node.NodeList):
             return v
         return [v]
 
     def recursiveDirs(self, root):
-        '''List of subdirectories.'''
-        if sys.version_info < (2, 6):
-            return [directory for directory, subdirs, files in os.walk(root) if directory.rfind("CVS") == -1]
-        else:
-            return [directory for directory, subdirs, files in os.walk(root, followlinks=True) if directory.rfind("CVS") == -1]
+        '''
+        Generates root and its subdirectories (the CVS directories are not walked).
+        '''
+        for directory, files in walkFiles(root):
+            yield directory
 
     def unique(self, seq):
         '''Removes duplicates. Element order preserved.'''
-        seen = set()
-        return [x for x in seq if x not in seen and not seen.add(x)]
+        return list(dict.fromkeys(seq))
 
     def scanFilesInDir(self, directory, accept, reject, recursive=True, inBuildDir=False):
         '''
         Recursively search files in 'directory' that matches 'accepts' wildcards and doesn't contain 'reject'
         '''
-        l_accept = self.asList( accept )
-        l_reject = self.asList( reject )
-        sources = []
-        realcwd = self.getRealAbsoluteCwd()
-        paths = []
-        dd = self.getRealAbsoluteCwd(directory)
-        paths = self.recursiveDirs( dd ) if recursive else dd
-
-        for path in paths:
-            for pattern in l_accept:
-                sources += SCons.Script.Glob(os.path.join(path, pattern), strings=True) # string=True to return files as strings
-        for pattern in l_reject:
-            sources = [a for a in sources if a.rfind(pattern) == -1]
+        root = self.getRealAbsoluteCwd(directory)
+        if self.env['use_scons_glob']:
+            sources = []
+            for path in (self.recursiveDirs( root ) if recursive else [root]):
+                for pattern in self.asList( accept ):
+                    sources += SCons.Script.Glob(os.path.join(path, pattern), strings=True) # string=True to return files as strings
+        else:
+            sources = findFiles( root, tuple(self.asList(accept)), recursive )
+        return self.filterScannedFiles(sources, reject, inBuildDir)
+
+    def filterScannedFiles(self, sources, reject, inBuildDir=False):
+        '''
+        Removes the files containing 'reject' and converts them to paths usable in the current SConscript.
+        '''
+        l_reject = tuple(self.asList( reject ))
+        if l_reject:
+            # a single pass on the files for all the patterns
+            sources = [a for a in sources if not any(pattern in a for pattern in l_reject)]
         # to relative paths (to allow scons variant_dir to recognize files...)
-        def toLocalDirs(d): return d.replace(realcwd + os.sep, '')
-        lsources = self.inBuildDir(sources) if inBuildDir else map(toLocalDirs, sources)
-        return self.unique(lsources)
+        cwd = self.getRealAbsoluteCwd()
+        prefix = cwd + os.sep
+        if inBuildDir:
+            topDir, buildDir = self.dir, self.dir_output_build
+            buildCwd = _pathInBuildDir(topDir, buildDir, cwd)
+            if buildCwd == cwd or buildDir.startswith(prefix):
+                # the build directory is not beside the current directory, use the general case
+                return self.unique(self.inBuildDir(sources))
+            # the files of the current directory only need a new prefix
+            clen = len(cwd)
+            return self.unique([buildCwd + d[clen:] if d.startswith(prefix) else _pathInBuildDir(topDir, buildDir, d) for d in sources])
+        plen = len(prefix)
+        return self.unique([d[plen:] if d.startswith(prefix) else d for d in sources])
 
     def scanFiles(self, dirs=['.'], accept=['*.cpp', '*.cc', '*.c'], reject=['@', '_qrc', '_ui', '.moc.cpp'], unique=True, recursive=True, inBuildDir=False):
         '''
         Recursively search files in "dirs" that matches 'accepts' wildcards and don't contains "reject"
+        The results are cached for the whole parsing of the SConscripts: files created after the first
+        scan of the same directories with the same patterns are not found.
         @param[in] unique Uniquify the list of files
         '''
         l_dirs = self.asList( dirs )
-        files = []
-        for d in l_dirs:
-            files += self.scanFilesInDir(d, accept, reject, recursive, inBuildDir)
-        if not unique:
-            return files
-        return self.unique(files)
+        # relative directories depend on the current SConscript directory
+        key = (self.getRealAbsoluteCwd(), tuple(map(str, l_dirs)), tuple(self.asList(accept)), tuple(self.asList(reject)), unique, recursive, inBuildDir)
+        files = self._scanCache.get(key)
+        if files is None:
+            files = []
+            if len(l_dirs) > 1 and not self.env['use_scons_glob']:
+                # walk the directories in parallel, the SCons functions are only called from this thread
+                roots = [self.getRealAbsoluteCwd(d) for d in l_dirs]
+                patterns = tuple(self.asList(accept))
+                # the threads are waiting for the file system most of the time, so they don't compete for the GIL
+                from concurrent.futures import ThreadPoolExecutor
+                jobs = SCons.Script.GetOption('num_jobs') or 1
+                with ThreadPoolExecutor(min(len(roots), max(jobs, os.cpu_count() or 1))) as executor:
+                    scanned = list(executor.map(lambda root: findFiles(root, patterns, recursive), roots))
+                for sources in scanned:
+                    files += self.filterScannedFiles(sources, reject, inBuildDir)
+            else:
+                for d in l_dirs:
+                    files += self.scanFilesInDir(d, accept, reject, recursive, inBuildDir)
+            if unique:
+                files = self.unique(files)
+            files = self._scanCache.setdefault(key, tuple(files))
+        return list(files)
+
+    def scanFilesMulti(self, dirs, buckets, recursive=True):
+        '''
+        Same as scanFiles for several sets of patterns, but each directory is only walked once.
+        @param[in] buckets dict of name: (accept, reject, inBuildDir)
+        @return dict of name: list of files
+        '''
+        if self.env['use_scons_glob']:
+            return dict( (name, self.scanFiles(dirs, accept, reject, recursive=recursive, inBuildDir=inBuildDir))
+                         for name, (accept, reject, inBuildDir) in buckets.items() )
+        l_dirs = self.asList( dirs )
+        realcwd = self.getRealAbsoluteCwd()
+        # same keys than scanFiles, so both share the results
+        keys = dict( (name, (realcwd, tuple(map(str, l_dirs)), tuple(self.asList(accept)), tuple(self.asList(reject)), True, recursive, inBuildDir))
+                     for name, (accept, reject, inBuildDir) in buckets.items() )
+        missing = [name for name in buckets if keys[name] not in self._scanCache]
+        if missing:
+            found = dict( (name, []) for name in missing )
+            matchers = dict( (name, patternsMatcher(tuple(self.asList(buckets[name][0])))) for name in missing )
+            for d in l_dirs:
+                # same file names than findFiles: normalized root, hidden files only matched by '.*' patterns
+                for path, names in walkFiles(os.path.normpath(self.getRealAbsoluteCwd(d)), recursive):
+                    for name in missing:
+                        found[name] += [os.path.join(path, n) for n in filter(matchers[name], names)]
+            for name in missing:
+                reject, inBuildDir = buckets[name][1:]
+                self._scanCache.setdefault( keys[name], tuple(self.filterScannedFiles(found[name], reject, inBuildDir)) )
+        return dict( (name, list(self._scanCache[keys[name]])) for name in buckets )
+
+    def scanSourcesAndHeaders(self, dirs, accept, reject):
+        '''
+        Returns the source files of a target (in the build directory) and its headers.
+        Headers are only needed for the visual projects, so they are only searched on windows.
+        '''
+        buckets = { 'sources': (accept, reject, True) }
+        if self.windows:
+            buckets['headers'] = (self.headerPatterns, self.headerReject, False)
+        files = self.scanFilesMulti( dirs, buckets )
+        return files['sources'], files.get('headers', [])
 
     def dirnames(self, files):
-        '''Returns the list of files dirname.'''
-        dirs = self.unique(map(os.path.dirname, files))
-        dirs.sort()
-        return dirs
+        '''Returns the sorted list of files dirname.'''
+        return sorted( set(map(os.path.dirname, files)) )
 
     def subdirsContaining(self, directory, patterns):
         '''
         Returns all sub directories of 'directory' containing a file matching 'patterns'.
         '''
-        dirs = self.dirnames(self.scanFiles(directory, accept=patterns))
-        dirs.sort()
-        return dirs
+        return self.dirnames(self.scanFiles(directory, accept=patterns))
 
 
 __all__ = ['SConsProject']
@@ -34,6 +34,7 @@ selection method.
 
 __revision__ = "src/engine/SCons/Tool/qt.py 5023 2010/06/14 22:05:46 scons"
 
+import bisect
 import os.path
 import re
 
@@ -64,33 +65,54 @@ if SCons.Util.case_sensitive_suffixes('.h', '.H'):
 #cxx_suffixes = cplusplus.CXXSuffixes
 cxx_suffixes = [".c", ".cxx", ".cpp", ".cc"]
 
-# this function replace a given pattern (pat) by s_after inside the file fname
-def fileReplace(fname, pat, s_after):
-    # first, see if the pattern is even in the file.
-    with open(fname) as f:
-        if not any(re.search(pat, line) for line in f):
-            return # pattern does not occur in file so we are done.
+# some shortcuts used by the emitters
+splitext = SCons.Util.splitext
+adjustixes = SCons.Util.adjustixes
+# for the membership test, the list keeps the order of the builders
+cxx_suffixes_set = frozenset(cxx_suffixes)
+
+# Q_OBJECT detection, on the raw contents of the files
+q_object_search = re.compile(rb'[^A-Za-z0-9]Q_OBJECT[^A-Za-z0-9]')
+# relative include generated by moc, like #include "../../foo.hpp"
+relative_include_search = re.compile(r'#include\s+"(\.\./)+')
+# includes of a .ui file, the tag may span several lines
+uic_include_search = re.compile(r'<include.*?>(.*?)</include>', re.S)
 
-    # pattern is in the file, so perform replace operation.
+# this function replace a given compiled pattern (pat) by s_after inside the file fname
+def fileReplace(fname, pat, s_after):
     with open(fname) as f:
-        out_fname = fname + ".tmp"
-        out = open(out_fname, "w")
-        for line in f:
-            out.write(re.sub(pat, s_after, line))
-        out.close()
-        f.close();
-        os.remove(fname)
-        os.rename(out_fname, fname)
+        contents = f.read()
+    contents, n = pat.subn(s_after, contents)
+    if n == 0:
+        return # pattern does not occur in file so we are done.
+
+    # pattern is in the file, so write the new contents and swap the files atomically
+    # (os.replace overwrites the destination, also on windows).
+    out_fname = fname + ".tmp"
+    try:
+        with open(out_fname, "w") as out:
+            out.write(contents)
+        os.replace(out_fname, fname)
+    except:
+        # don't leave a partial temporary file next to the moc output
+        if os.path.exists(out_fname):
+            os.remove(out_fname)
+        raise
 
 # simplify very long useless includes such as #include "../../../../foo.hpp" with #include "./foo.hpp"
 # this is useful because moc generates very long relative includes that implies issues on windows OS.
 def simplifyInclude(target, source, env):
-    fileReplace(target[0].rstr(), "#include\s+\"(\.\./)+", "#include \"" + os.getcwd().replace("\\", "/") + "/" );
+    fileReplace(target[0].rstr(), relative_include_search, "#include \"" + os.getcwd().replace("\\", "/") + "/" );
     return None
 
 def checkMocIncluded(target, source, env):
 	moc = target[0]
 	cpp = source[0]
+	# the common case: the cpp includes the moc file, no need to scan it
+	# (same include lines than the C scanner, so a commented line doesn't count)
+	include_moc = re.compile(rb'^[ \t]*#[ \t]*include[ \t]*["<](?:[^">\n]*[/\\])?' + re.escape(moc.name.encode()) + rb'[">]', re.M)
+	if include_moc.search(cpp.get_contents()):
+		return
 	# looks like cpp.includes is cleared before the build stage :-(
 	# not really sure about the path transformations (moc.cwd? cpp.cwd?) :-/
 	path = SCons.Defaults.CScan.path(env, moc.cwd)
@@ -108,6 +130,119 @@ def find_file(filename, paths, node_factory):
 			return node
 	return None
 
+def int_variable(env, name, default):
+	"""Returns the integer value of the construction variable name, or default if it is not an integer."""
+	value = env.get(name)
+	if isinstance(value, int):
+		# no substitution needed for the common case
+		return value
+	try:
+		return int(env.subst('$' + name))
+	except ValueError:
+		return default
+
+# variable referenced in a construction variable, like $CXXFILESUFFIX or ${CXXFILESUFFIX}
+variable_reference_search = re.compile(r'\$\{?([A-Za-z_][A-Za-z0-9_]*)')
+
+# substituted values, by signature of the variables they depend on
+subst_cache = {}
+
+def subst_signature(env, name):
+	"""
+	Returns the raw values of the variable name and of all the variables it references,
+	or None if one of them is not a plain string (and may depend on anything).
+	"""
+	signature = []
+	pending = [name]
+	seen = set()
+	while pending:
+		current = pending.pop()
+		if current in seen:
+			continue
+		seen.add(current)
+		value = env.get(current, '')
+		if not SCons.Util.is_String(value):
+			return None
+		signature.append((current, value))
+		pending.extend(variable_reference_search.findall(value))
+	return tuple(signature)
+
+def subst_variable(env, name):
+	"""
+	Returns the substituted value of the construction variable name.
+	The result is shared by the environments with the same values for the variables involved.
+	"""
+	value = env.get(name)
+	if SCons.Util.is_String(value) and '$' not in value:
+		# constant string, nothing to substitute
+		return value
+	signature = subst_signature(env, name)
+	if signature is None:
+		return env.subst('$' + name)
+	if signature not in subst_cache:
+		subst_cache[signature] = env.subst('$' + name)
+	return subst_cache[signature]
+
+def iter_flat(sequence):
+	"""Iterates over the items of nested sequences, like SCons.Util.flatten without building a list."""
+	for item in sequence:
+		if SCons.Util.is_Sequence(item):
+			yield from iter_flat(item)
+		else:
+			yield item
+
+# Q_OBJECT detection of each file node already scanned, a file is often
+# scanned by several emitters (eg. for a static and a shared library)
+q_object_cache = {}
+
+def get_contents(node):
+	#return comment.sub('', node.get_text_contents())
+	return node.get_contents()
+
+def find_q_objects(contents):
+	"""
+	Returns for each item of contents (a list of bytes) if it contains the Q_OBJECT macro.
+	All the contents are searched in a single pass: they are joined by an alphanumeric
+	separator, so a match can't span two of them and is found like in each one separately.
+	"""
+	found = [False] * len(contents)
+	starts = []
+	start = 0
+	for data in contents:
+		starts.append(start)
+		start += len(data) + 1
+	joined = b'0'.join(contents)
+	pos = joined.find(b'Q_OBJECT', 1)
+	while pos != -1:
+		# check the characters around the candidate
+		if q_object_search.match(joined, pos - 1):
+			index = bisect.bisect_right(starts, pos) - 1
+			found[index] = True
+			# the other matches of this item don't matter
+			if index + 1 == len(starts):
+				break
+			pos = joined.find(b'Q_OBJECT', starts[index + 1] + 1)
+		else:
+			pos = joined.find(b'Q_OBJECT', pos + 1)
+	return found
+
+def scan_q_objects(pairs):
+	"""
+	Returns the Q_OBJECT detection of each (cpp, h) pair of nodes, as (cpp_q_object, h_q_object) tuples.
+	Each file is only read once, by several threads: reading them is the main cost of the scan.
+	"""
+	pairs = list(pairs)
+	nodes = [node for node in dict.fromkeys(node for pair in pairs for node in pair)
+	         if node is not None and node not in q_object_cache]
+	if len(nodes) < 2:
+		contents = [get_contents(node) for node in nodes]
+	else:
+		from concurrent.futures import ThreadPoolExecutor
+		with ThreadPoolExecutor(min(32, (os.cpu_count() or 1) * 4, len(nodes))) as executor:
+			contents = list(executor.map(get_contents, nodes))
+	q_object_cache.update(zip(nodes, find_q_objects(contents)))
+	return [(q_object_cache[cpp], h is not None and q_object_cache[h]) for cpp, h in pairs]
+
 class _Automoc(object):
 	"""
 	Callable class, which works as an emitter for Programs, SharedLibraries and
@@ -122,83 +257,84 @@ class _Automoc(object):
 		Smart autoscan function. Gets the list of objects for the Program
 		or Lib. Adds objects and builders for the special qt files.
 		"""
-		try:
-			if int(env.subst('$QT_AUTOSCAN')) == 0:
-				return target, source
-		except ValueError:
-			pass
-		try:
-			debug = int(env.subst('$QT_DEBUG'))
-		except ValueError:
-			debug = 0
-
-		# some shortcuts used in the scanner
-		splitext = SCons.Util.splitext
-		objBuilder = getattr(env, self.objBuilderName)
+		if int_variable(env, 'QT_AUTOSCAN', 1) == 0:
+			return target, source
+		debug = int_variable(env, 'QT_DEBUG', 0)
+
+		# the builders are called with env itself (which may be an override
+		# environment) instead of the environment their wrappers are bound to
+		builders = env['BUILDERS']
+		objBuilder = builders[self.objBuilderName]
+		mocBuilder = builders['Moc']
   
 		# some regular expressions:
-		# Q_OBJECT detection
-		q_object_search = re.compile(r'[^A-Za-z0-9]Q_OBJECT[^A-Za-z0-9]') 
 		# cxx and c comment 'eater'
 		#comment = re.compile(r'(//.*)|(/\*(([^*])|(\*[^/]))*\*/)')
 		# CW: something must be wrong with the regexp. See also bug #998222
 		#	 CURRENTLY THERE IS NO TEST CASE FOR THAT
 		
-		# The following is kind of hacky to get builders working properly (FIXME)
-		objBuilderEnv = objBuilder.env
-		objBuilder.env = env
-		mocBuilderEnv = env.Moc.env
-		env.Moc.env = env
-		
+		# header of each (directory, basename), shared by all the sources of the target
+		header_cache = {}
+		def find_header(cpp_dir, stem):
+			key = (id(cpp_dir), stem)
+			if key not in header_cache:
+				h = None
+				for h_ext in header_extensions:
+					hname = stem + h_ext
+					# one listdir per directory (cached by SCons) instead of a stat per extension
+					if not cpp_dir.rentry_exists_on_disk(hname):
+						continue
+					h = find_file(hname, (cpp_dir,), env.File)
+					if h:
+						break
+				header_cache[key] = h
+			return header_cache[key]
+
 		# make a deep copy for the result; MocH objects will be appended
 		out_sources = source[:]
 
-		for obj in SCons.Util.flatten(source):
+		# the sources to scan, with their header
+		scanned = []
+		for obj in iter_flat(source):
 			if not isinstance(obj, SCons.Node.Node) or not obj.has_builder():
 				# binary obj file provided
 				if debug:
 					print("scons: qt: '%s' seems to be a binary. Discarded." % str(obj))
 				continue
 			cpp = obj.sources[0]
-			if not splitext(str(cpp))[1] in cxx_suffixes:
+			stem, cpp_suffix = splitext(cpp.name)
+			if not cpp_suffix in cxx_suffixes_set:
 				if debug:
 					print("scons: qt: '%s' is no cxx file. Discarded." % str(cpp))
 					# c or fortran source
 				continue
-			#cpp_contents = comment.sub('', cpp.get_text_contents())
-			cpp_contents = cpp.get_text_contents()
-			h=None
-			for h_ext in header_extensions:
-				# try to find the header file in the corresponding source
-				# directory
-				hname = splitext(cpp.name)[0] + h_ext
-				h = find_file(hname, (cpp.get_dir(),), env.File)
-				if h:
-					if debug:
-						print("scons: qt: Scanning '%s' (header of '%s')" % (str(h), str(cpp)))
-					#h_contents = comment.sub('', h.get_text_contents())
-					h_contents = h.get_text_contents()
-					break
-			if not h and debug:
+			# try to find the header file in the corresponding source
+			# directory
+			h = find_header(cpp.get_dir(), stem)
+			if h:
+				if debug:
+					print("scons: qt: Scanning '%s' (header of '%s')" % (str(h), str(cpp)))
+			elif debug:
 				print("scons: qt: no header for '%s'." % (str(cpp)))
-			if h and q_object_search.search(h_contents):
+			scanned.append((cpp, h))
+
+		# the files are read in parallel, the builders are only called from this thread
+		for (cpp, h), (cpp_q_object, h_q_object) in zip(scanned, scan_q_objects(scanned)):
+			if h_q_object:
 				# h file with the Q_OBJECT macro found -> add moc_cpp
-				moc_cpp = env.Moc(h)
-				moc_o = objBuilder(moc_cpp)
+				moc_cpp = mocBuilder(env, source=[h])
+				moc_o = objBuilder(env, source=moc_cpp)
 				out_sources.append(moc_o)
 				#moc_cpp.target_scanner = SCons.Defaults.CScan
 				if debug:
 					print("scons: qt: found Q_OBJECT macro in '%s', moc'ing to '%s'" % (str(h), str(moc_cpp)))
-			if cpp and q_object_search.search(cpp_contents):
+			if cpp_q_object:
 				# cpp file with Q_OBJECT macro found -> add moc
 				# (to be included in cpp)
-				moc = env.Moc(cpp)
+				moc = mocBuilder(env, source=[cpp])
 				env.Ignore(moc, moc)
 				print("scons: qt: found Q_OBJECT macro in '%s', moc'ing to '%s'" % (str(cpp), str(moc)))
 				#moc.source_scanner = SCons.Defaults.CScan
-		# restore the original env attributes (FIXME)
-		objBuilder.env = objBuilderEnv
-		env.Moc.env = mocBuilderEnv
 
 		return (target, out_sources)
 
@@ -206,8 +342,7 @@ AutomocShared = _Automoc('SharedObject')
 AutomocStatic = _Automoc('StaticObject')
 
 def uicEmitter(target, source, env):
-	adjustixes = SCons.Util.adjustixes
-	bs = SCons.Util.splitext(str(source[0].name))[0]
+	bs = splitext(str(source[0].name))[0]
 	bs = os.path.join(str(target[0].get_dir()),bs)
 	# first target (header) is automatically added by builder
 	if len(target) < 2:
@@ -216,8 +351,8 @@ def uicEmitter(target, source, env):
 			#env.File(
 				adjustixes(
 					bs,
-					env.subst('$QT_UICIMPLPREFIX'),
-					env.subst('$QT_UICIMPLSUFFIX')
+					subst_variable(env, 'QT_UICIMPLPREFIX'),
+					subst_variable(env, 'QT_UICIMPLSUFFIX')
 				)
 			#)
 		)
@@ -247,10 +382,12 @@ def uicEmitter(target, source, env):
 	return target, source
 
 def uicScannerFunc(node, env, path):
+	includes = uic_include_search.findall(node.get_text_contents())
+	if not includes:
+		return []
 	lookout = []
 	lookout.extend(env['CPPPATH'])
 	lookout.append(str(node.rfile().dir))
-	includes = re.findall("<include.*?>(.*?)</include>", node.get_text_contents())
 	result = []
 	for incFile in includes:
 		dep = env.FindFile(incFile,lookout)
@@ -330,13 +467,14 @@ def generate(env):
 		)
 
 	mocBld = Builder(action={}, prefix={}, suffix={})
+	# the same actions are shared by all the extensions
+	act = SCons.Action.Action('$QT_MOCFROMHCOM', '$QT_MOCFROMHCOMSTR')
 	for h in header_extensions:
-		act = SCons.Action.Action('$QT_MOCFROMHCOM', '$QT_MOCFROMHCOMSTR')
 		mocBld.add_action(h, act)
 		mocBld.prefix[h] = '$QT_MOCHPREFIX'
 		mocBld.suffix[h] = '$QT_MOCHSUFFIX'
+	act = SCons.Action.Action('$QT_MOCFROMCXXCOM', '$QT_MOCFROMCXXCOMSTR')
 	for cxx in cxx_suffixes:
-		act = SCons.Action.Action('$QT_MOCFROMCXXCOM', '$QT_MOCFROMCXXCOMSTR')
 		mocBld.add_action(cxx, act)
 		mocBld.prefix[cxx] = '$QT_MOCCXXPREFIX'
 		mocBld.suffix[cxx] = '$QT_MOCCXXSUFFIX'
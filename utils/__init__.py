@@ -1 +1 @@
-from . import utils, colors
+from . import utils, colors, jobserver
@@ -0,0 +1,77 @@
+'''
+Client of the GNU make jobserver.
+When SCons is called from a "make -jN", the commands wait for a job token of make,
+so make and SCons together don't run more than N jobs.
+'''
+
+import os
+import re
+
+
+_authRe = re.compile(r'--jobserver-(?:auth|fds)=(fifo:(\S+)|(\d+),(\d+))')
+
+_fds = None # (read, write) file descriptors of the jobserver, False if there is no jobserver
+
+
+def jobserverFds():
+	'''
+	Returns the (read, write) file descriptors of the jobserver defined in $MAKEFLAGS, or None.
+	'''
+	global _fds
+	if _fds is None:
+		_fds = False
+		match = _authRe.search(os.environ.get('MAKEFLAGS', ''))
+		if match and os.name != 'nt': # make uses a semaphore on windows
+			try:
+				if match.group(2):
+					fd = os.open(match.group(2), os.O_RDWR)
+					_fds = (fd, fd)
+				else:
+					fds = (int(match.group(3)), int(match.group(4)))
+					# the descriptors are only inherited if the make rule starts with "+"
+					for fd in fds:
+						os.fstat(fd)
+					_fds = fds
+			except (OSError, ValueError):
+				_fds = False
+	return _fds or None
+
+def acquireToken(readFd):
+	'''Wait for a job token, returns it.'''
+	import select
+	while True:
+		try:
+			token = os.read(readFd, 1)
+			if token:
+				return token
+		except BlockingIOError:
+			pass
+		except InterruptedError:
+			continue
+		select.select([readFd], [], [])
+
+def wrapSpawn(spawn, fds):
+	'''
+	Returns a SCons SPAWN function which runs "spawn" with a job token.
+	'''
+	readFd, writeFd = fds
+	def jobserverSpawn(sh, escape, cmd, args, env):
+		token = acquireToken(readFd)
+		try:
+			return spawn(sh, escape, cmd, args, env)
+		finally:
+			os.write(writeFd, token)
+	jobserverSpawn.usesJobserver = True
+	return jobserverSpawn
+
+def useJobserver(env):
+	'''
+	Run the commands of "env" with a job token of the make jobserver, if any.
+	Returns True if the jobserver is used.
+	'''
+	fds = jobserverFds()
+	if not fds or 'SPAWN' not in env:
+		return False
+	if not getattr(env['SPAWN'], 'usesJobserver', False): # only one token by command
+		env['SPAWN'] = wrapSpawn(env['SPAWN'], fds)
+	return True